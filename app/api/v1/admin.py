@@ -260,7 +260,7 @@ async def get_user_settings(
     """
     try:
         db = MongoDB.get_database()
-        user = await db.users.find_one({"github_id": int(user_id)})
+        user = await db.users.find_one({"github_id": int(user_id)}, {"settings": 1})
         
         if not user:
             return {
@@ -144,7 +144,7 @@ async def trigger_analysis(request: TriggerAnalysisRequest, user_id: str = Query
         user_settings = None
         if user_id:
             db = MongoDB.get_database()
-            user = await db.users.find_one({"github_id": int(user_id)})
+            user = await db.users.find_one({"github_id": int(user_id)}, {"settings": 1})
             if user and user.get("settings"):
                 user_settings = {
                     "llm_provider": user["settings"].get("llm_provider"),
@@ -26,7 +26,7 @@ async def get_user_installations(user_id: str) -> List[Dict[str, Any]]:
     """
     try:
         db = MongoDB.get_database()
-        user = await db.users.find_one({"github_id": int(user_id)})
+        user = await db.users.find_one({"github_id": int(user_id)}, {"installations": 1})
         
         if not user:
             return []
@@ -263,7 +263,7 @@ async def notify_graph_update(user_id: str, repo_full_name: str, event_type: str
     graph_update_events[user_id].append({
         "type": event_type,
         "repository": repo_full_name,
-        "timestamp": asyncio.get_event_loop().time()
+        "timestamp": asyncio.get_running_loop().time()
     })
     
     # Keep only last 100 events per user
@@ -25,7 +25,10 @@ async def verify_user_repo_access(user_id: str, repo_full_name: str) -> bool:
     """
     try:
         db = MongoDB.get_database()
-        user = await db.users.find_one({"github_id": int(user_id)})
+        user = await db.users.find_one(
+            {"github_id": int(user_id)},
+            {"installations.account_login": 1, "installations.repositories": 1}
+        )
         
         if not user:
             return False
@@ -13,6 +13,7 @@ class Settings(BaseSettings):
     APP_HOST: str = "0.0.0.0"
     APP_PORT: int = 8000
     SECRET_KEY: str
+    ENCRYPTION_ASYNC: bool = True  # Run token encrypt/decrypt in a worker thread
 
     # LLM Provider Configuration
     LLM_PROVIDER: str = "anthropic"  # Options: anthropic, openai, gemini, openrouter
@@ -37,6 +38,8 @@ class Settings(BaseSettings):
     NEO4J_URI: str
     NEO4J_USER: str
     NEO4J_PASSWORD: str
+    NEO4J_IMPORT_DIR: Optional[str] = None  # Local path of Neo4j's import dir; enables CSV bulk import
+    NEO4J_CSV_IMPORT_THRESHOLD: int = 5000  # Node count above which indexing uses CSV import
 
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
@@ -58,6 +61,7 @@ class Settings(BaseSettings):
     # Celery
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
+    CELERY_USE_UVLOOP: bool = True  # Run worker tasks on a uvloop event loop
 
     # Arize Phoenix Tracing
     PHOENIX_ENABLED: bool = True
@@ -116,13 +116,20 @@ async def create_mongodb_indexes():
     try:
         db = MongoDB.get_database()
 
+        # Indexes for users collection
+        await db.users.create_index([("github_id", 1)], unique=True)
+
         # Indexes for analyses collection
+        await db.analyses.create_index([("id", 1)], unique=True)
         await db.analyses.create_index([("pr_number", 1), ("repo_full_name", 1)])
         await db.analyses.create_index([("parent_analysis_id", 1)])
         await db.analyses.create_index([("repo_full_name", 1), ("created_at", -1)])
         await db.analyses.create_index([("commit_sha", 1)])
         await db.analyses.create_index([("iteration_number", 1)])
 
+        # Indexes for analysis_results collection (large per-analysis payloads)
+        await db.analysis_results.create_index([("analysis_id", 1)], unique=True)
+
         # Indexes for fix_patterns collection (RAG)
         await db.fix_patterns.create_index([("vulnerability_type", 1), ("file_extension", 1)])
         await db.fix_patterns.create_index([("success_count", -1)])
@@ -2,6 +2,7 @@
 
 from typing import Optional, Dict, Any
 from enum import Enum
+import asyncio
 import logging
 
 from app.core.config import settings
@@ -143,7 +144,9 @@ class LLMClient:
         self, system_prompt: str, user_prompt: str, temperature: float, max_tokens: int
     ) -> Dict[str, Any]:
         """Generate using Anthropic Claude"""
-        response = self.client.messages.create(
+        # The SDK client is synchronous; run it in a thread so concurrent calls overlap
+        response = await asyncio.to_thread(
+            self.client.messages.create,
             model=self.model,
             max_tokens=max_tokens,
             temperature=temperature,
@@ -165,7 +168,8 @@ class LLMClient:
         self, system_prompt: str, user_prompt: str, temperature: float, max_tokens: int
     ) -> Dict[str, Any]:
         """Generate using OpenAI GPT"""
-        response = self.client.chat.completions.create(
+        response = await asyncio.to_thread(
+            self.client.chat.completions.create,
             model=self.model,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -199,7 +203,7 @@ class LLMClient:
         # Gemini doesn't have separate system prompt, so combine them
         combined_prompt = f"{system_prompt}\n\n{user_prompt}"
 
-        response = model.generate_content(combined_prompt)
+        response = await asyncio.to_thread(model.generate_content, combined_prompt)
 
         # Gemini doesn't provide token counts in the same way, estimate
         text = response.text
@@ -218,7 +222,8 @@ class LLMClient:
         self, system_prompt: str, user_prompt: str, temperature: float, max_tokens: int
     ) -> Dict[str, Any]:
         """Generate using OpenRouter"""
-        response = self.client.chat.completions.create(
+        response = await asyncio.to_thread(
+            self.client.chat.completions.create,
             model=self.model,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -71,6 +71,10 @@ class Analysis(BaseModel):
         description="Full transcript of agent debate/discussion"
     )
     summary: Optional[str] = Field(None, description="Final analysis summary")
+    duplicate_of: Optional[str] = Field(
+        None,
+        description="ID of the analysis this run duplicated for the same commit"
+    )
 
     # Feedback
     user_approved: Optional[bool] = None
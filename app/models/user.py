@@ -1,12 +1,14 @@
 """User data models for GitHub OAuth authentication"""
 
 from pydantic import BaseModel, Field, EmailStr
+from pydantic.dataclasses import dataclass
 from typing import Optional, List
 from datetime import datetime
 
 
-class GitHubInstallation(BaseModel):
-    """GitHub App installation linked to a user"""
+@dataclass(slots=True)
+class GitHubInstallation:
+    """GitHub App installation linked to a user (slotted, one per installation)"""
     installation_id: int = Field(..., description="GitHub installation ID")
     account_login: str = Field(..., description="GitHub account/organization login")
     account_type: str = Field(..., description="Account type (User or Organization)")
@@ -3,6 +3,7 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List
 import logging
+import re
 import time
 
 from app.core.config import settings
@@ -11,6 +12,12 @@ from app.core.tracing import TracedSpan
 
 logger = logging.getLogger(__name__)
 
+# One "KEY: value" line of structured agent output; a single pass finds them all
+_FINDING_RE = re.compile(
+    r'^[^\S\n]*(FILE|LINE|SEVERITY|TYPE|DESCRIPTION|CWE|FIX):[^\S\n]*(.*?)[^\S\n]*$',
+    re.MULTILINE
+)
+
 
 class BaseAgent(ABC):
     """Base class for security analysis agents"""
@@ -90,36 +97,32 @@ class BaseAgent(ABC):
         This is a simplified version - in production, you'd use more sophisticated parsing
         """
         findings = []
-
-        # Split response into lines and look for structured output
-        lines = response.split('\n')
         current_finding = {}
 
-        for line in lines:
-            line = line.strip()
-
-            if line.startswith('FILE:'):
+        # Each FILE: line starts a new finding; the other keys fill in the current one
+        for key, value in _FINDING_RE.findall(response):
+            if key == 'FILE':
                 if current_finding:
                     findings.append(current_finding)
-                current_finding = {'type': finding_type, 'file_path': line.replace('FILE:', '').strip()}
+                current_finding = {'type': finding_type, 'file_path': value}
 
-            elif line.startswith('LINE:'):
-                current_finding['line_number'] = int(line.replace('LINE:', '').strip())
+            elif key == 'LINE':
+                current_finding['line_number'] = int(value)
 
-            elif line.startswith('SEVERITY:'):
-                current_finding['severity'] = line.replace('SEVERITY:', '').strip().lower()
+            elif key == 'SEVERITY':
+                current_finding['severity'] = value.lower()
 
-            elif line.startswith('TYPE:'):
-                current_finding['type'] = line.replace('TYPE:', '').strip()
+            elif key == 'TYPE':
+                current_finding['type'] = value
 
-            elif line.startswith('DESCRIPTION:'):
-                current_finding['description'] = line.replace('DESCRIPTION:', '').strip()
+            elif key == 'DESCRIPTION':
+                current_finding['description'] = value
 
-            elif line.startswith('CWE:'):
-                current_finding['cwe_id'] = line.replace('CWE:', '').strip()
+            elif key == 'CWE':
+                current_finding['cwe_id'] = value
 
-            elif line.startswith('FIX:'):
-                current_finding['recommended_fix'] = line.replace('FIX:', '').strip()
+            elif key == 'FIX':
+                current_finding['recommended_fix'] = value
 
         # Add last finding
         if current_finding and 'file_path' in current_finding:
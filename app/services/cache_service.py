@@ -1,6 +1,7 @@
 """Repository code caching service using Redis"""
 
 from typing import Optional, List, Dict, Any
+import hashlib
 import json
 import logging
 
@@ -14,6 +15,8 @@ class RepositoryCacheService:
     
     CACHE_TTL = 3600  # 1 hour default TTL
     CACHE_PREFIX = "repo_cache"
+    COMPRESSION_CACHE_TTL = 604800  # 7 days, same as the index flag
+    COMPRESSION_PREFIX = "compression_cache"
     
     @staticmethod
     def _get_cache_key(repo_full_name: str, commit_sha: str) -> str:
@@ -87,6 +90,109 @@ class RepositoryCacheService:
             logger.warning(f"Failed to cache code: {e}")
             return False
     
+    @staticmethod
+    def fingerprint_code_files(code_files: List[Dict[str, Any]]) -> str:
+        """
+        Fingerprint the exact file set being compressed.
+
+        This hashes every file's content, so callers should run it off the
+        event loop once and pass the result to both compression cache calls.
+        """
+        fingerprint = hashlib.sha256()
+        for file in sorted(code_files, key=lambda f: f['path']):
+            fingerprint.update(file['path'].encode())
+            fingerprint.update(hashlib.sha256(file.get('content', '').encode()).digest())
+        return fingerprint.hexdigest()[:32]
+
+    @staticmethod
+    def _get_compression_key(
+        repo_full_name: str,
+        commit_sha: str,
+        target_tokens: int,
+        fingerprint: str
+    ) -> str:
+        """Generate compression cache key for a fingerprinted file set"""
+        return (
+            f"{RepositoryCacheService.COMPRESSION_PREFIX}:{repo_full_name}:{commit_sha}:"
+            f"{target_tokens}:{fingerprint}"
+        )
+
+    @staticmethod
+    async def get_cached_compression(
+        repo_full_name: str,
+        commit_sha: str,
+        target_tokens: int,
+        fingerprint: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve a cached compression result for a repository at a specific commit.
+        
+        Args:
+            repo_full_name: Full repository name (owner/repo)
+            commit_sha: Git commit SHA
+            target_tokens: Target token count
+            fingerprint: File set fingerprint from fingerprint_code_files
+            
+        Returns:
+            Compression result dict if cache hit, None if cache miss
+        """
+        try:
+            redis = RedisDB.get_client()
+            cache_key = RepositoryCacheService._get_compression_key(
+                repo_full_name, commit_sha, target_tokens, fingerprint
+            )
+            
+            cached_data = await redis.get(cache_key)
+            
+            if cached_data:
+                logger.info(f"Compression cache hit for {repo_full_name}@{commit_sha[:7]}")
+                return json.loads(cached_data)
+            
+            return None
+            
+        except Exception as e:
+            logger.warning(f"Compression cache lookup failed: {e}")
+            return None
+
+    @staticmethod
+    async def cache_compression(
+        repo_full_name: str,
+        commit_sha: str,
+        target_tokens: int,
+        fingerprint: str,
+        compression_result: Dict[str, Any],
+        ttl: int = None
+    ) -> bool:
+        """
+        Cache a compression result for a repository at a specific commit.
+        
+        Args:
+            repo_full_name: Full repository name (owner/repo)
+            commit_sha: Git commit SHA
+            target_tokens: Target token count the result was compressed to
+            fingerprint: Fingerprint of the compressed files from fingerprint_code_files
+            compression_result: Result from CompressionService.compress_code
+            ttl: Time to live in seconds (default: 7 days)
+            
+        Returns:
+            True if cached successfully, False otherwise
+        """
+        try:
+            redis = RedisDB.get_client()
+            cache_key = RepositoryCacheService._get_compression_key(
+                repo_full_name, commit_sha, target_tokens, fingerprint
+            )
+            cache_ttl = ttl or RepositoryCacheService.COMPRESSION_CACHE_TTL
+            
+            await redis.setex(cache_key, cache_ttl, json.dumps(compression_result))
+            
+            logger.info(f"Cached compression for {repo_full_name}@{commit_sha[:7]} (TTL: {cache_ttl}s)")
+            return True
+            
+        except Exception as e:
+            logger.warning(f"Failed to cache compression: {e}")
+            return False
+    
     @staticmethod
     async def invalidate_cache(repo_full_name: str) -> int:
         """
@@ -1,9 +1,10 @@
 """Code Parser Service for extracting code structure using AST"""
 
 import ast
+import asyncio
 import re
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
@@ -35,12 +36,38 @@ class CodeParserService:
         """
         Parse multiple code files and extract structure.
         
+        Parsing is CPU-bound, so it runs in a worker thread rather than on the
+        event loop. (Celery prefork children are daemonic and can't start a
+        process pool of their own.)
+        
         Args:
             code_files: List of dicts with 'path' and 'content'
             
         Returns:
             Dict with files, functions, classes, imports, and relationships
         """
+        return await asyncio.to_thread(CodeParserService.parse_files_sync, code_files)
+    
+    @staticmethod
+    def parse_files_sync(code_files: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Synchronous parse_files, for running in a thread"""
+        result = CodeParserService._parse_batch(code_files)
+        CodeParserService._log_summary(result)
+        return result
+    
+    @staticmethod
+    def _log_summary(result: Dict[str, Any]):
+        """Log counts for a parsed code structure"""
+        logger.info(
+            f"Parsed {len(result['files'])} files: "
+            f"{len(result['functions'])} functions, "
+            f"{len(result['classes'])} classes, "
+            f"{len(result['imports'])} imports"
+        )
+    
+    @staticmethod
+    def _parse_batch(code_files: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Parse a batch of files into one code structure, tagging entries with their file"""
         result = {
             "files": [],
             "functions": [],
@@ -58,7 +85,7 @@ class CodeParserService:
                 continue
             
             try:
-                file_structure = await CodeParserService.parse_file(path, content)
+                file_structure = CodeParserService.parse_file_sync(path, content)
                 
                 # Add file
                 result["files"].append({
@@ -91,13 +118,6 @@ class CodeParserService:
                 logger.warning(f"Failed to parse {path}: {e}")
                 continue
         
-        logger.info(
-            f"Parsed {len(result['files'])} files: "
-            f"{len(result['functions'])} functions, "
-            f"{len(result['classes'])} classes, "
-            f"{len(result['imports'])} imports"
-        )
-        
         return result
     
     @staticmethod
@@ -108,6 +128,11 @@ class CodeParserService:
         Returns:
             Dict with language, functions, classes, imports, calls
         """
+        return CodeParserService.parse_file_sync(file_path, content)
+    
+    @staticmethod
+    def parse_file_sync(file_path: str, content: str) -> Dict[str, Any]:
+        """Synchronous parse_file"""
         ext = Path(file_path).suffix.lower()
         language = CodeParserService.SUPPORTED_LANGUAGES.get(ext, 'unknown')
         
@@ -120,24 +145,24 @@ class CodeParserService:
         }
         
         if language == 'python':
-            result = await CodeParserService._parse_python(content)
+            result = CodeParserService._parse_python(content)
         elif language in ('javascript', 'typescript'):
-            result = await CodeParserService._parse_javascript(content)
+            result = CodeParserService._parse_javascript(content)
         elif language == 'java':
-            result = await CodeParserService._parse_java(content)
+            result = CodeParserService._parse_java(content)
         elif language in ('c', 'cpp'):
-            result = await CodeParserService._parse_c(content)
+            result = CodeParserService._parse_c(content)
         elif language == 'solidity':
-            result = await CodeParserService._parse_solidity(content)
+            result = CodeParserService._parse_solidity(content)
         else:
             # Generic regex-based parsing for other languages
-            result = await CodeParserService._parse_generic(content)
+            result = CodeParserService._parse_generic(content)
         
         result["language"] = language
         return result
     
     @staticmethod
-    async def _parse_python(content: str) -> Dict[str, Any]:
+    def _parse_python(content: str) -> Dict[str, Any]:
         """Parse Python code using the ast module"""
         result = {
             "functions": [],
@@ -228,7 +253,7 @@ class CodeParserService:
         return result
     
     @staticmethod
-    async def _parse_javascript(content: str) -> Dict[str, Any]:
+    def _parse_javascript(content: str) -> Dict[str, Any]:
         """Parse JavaScript/TypeScript using regex patterns"""
         result = {
             "functions": [],
@@ -287,7 +312,7 @@ class CodeParserService:
         return result
     
     @staticmethod
-    async def _parse_java(content: str) -> Dict[str, Any]:
+    def _parse_java(content: str) -> Dict[str, Any]:
         """Parse Java using regex patterns"""
         result = {
             "functions": [],
@@ -336,7 +361,7 @@ class CodeParserService:
         return result
     
     @staticmethod
-    async def _parse_c(content: str) -> Dict[str, Any]:
+    def _parse_c(content: str) -> Dict[str, Any]:
         """Parse C/C++ using regex patterns"""
         result = {
             "functions": [],
@@ -381,7 +406,7 @@ class CodeParserService:
         return result
     
     @staticmethod
-    async def _parse_solidity(content: str) -> Dict[str, Any]:
+    def _parse_solidity(content: str) -> Dict[str, Any]:
         """Parse Solidity smart contracts"""
         result = {
             "functions": [],
@@ -431,7 +456,7 @@ class CodeParserService:
         return result
     
     @staticmethod
-    async def _parse_generic(content: str) -> Dict[str, Any]:
+    def _parse_generic(content: str) -> Dict[str, Any]:
         """Generic parsing using common patterns"""
         result = {
             "functions": [],
@@ -3,15 +3,27 @@
 import httpx
 from typing import Dict, Any, List
 import logging
+import re
 
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+_NON_ASCII_RE = re.compile(r'[^\x00-\x7f]')
+_DIGITS = "0123456789"
+
 
 class CompressionService:
     """Service for compressing code using Token Company API"""
 
+    # Send code through uncompressed when it's estimated under this share of the target
+    PASSTHROUGH_RATIO = 0.8
+
+    # Approximate tokens per character: ASCII text, digits, and non-ASCII (e.g. CJK)
+    TOKENS_PER_CHAR = 0.25
+    TOKENS_PER_DIGIT = 0.4
+    TOKENS_PER_NON_ASCII = 0.55
+
     def __init__(self):
         self.api_key = settings.TOKEN_COMPANY_API_KEY
         self.model = settings.TOKEN_COMPANY_MODEL
@@ -86,6 +98,49 @@ class CompressionService:
             # Fallback to simple compression
             return self._fallback_compression(code_files, target_tokens)
 
+    @staticmethod
+    def estimate_tokens(code_files: List[Dict[str, Any]], limit: int = None) -> int:
+        """
+        Cheaply estimate the token count of code files from character classes
+
+        Args:
+            code_files: List of code files with content
+            limit: Stop counting once the estimate exceeds this
+
+        Returns:
+            Approximate token count (only exact up to limit, if given)
+        """
+        total = 0.0
+        for file in code_files:
+            content = file.get('content') or ''
+            digits = sum(content.count(d) for d in _DIGITS)
+            non_ascii = 0 if content.isascii() else len(_NON_ASCII_RE.findall(content))
+            total += (
+                (len(content) - digits - non_ascii) * CompressionService.TOKENS_PER_CHAR
+                + digits * CompressionService.TOKENS_PER_DIGIT
+                + non_ascii * CompressionService.TOKENS_PER_NON_ASCII
+            )
+            if limit is not None and total > limit:
+                break
+        return int(total)
+
+    def should_compress(self, code_files: List[Dict[str, Any]], target_tokens: int) -> bool:
+        """Whether code files are large enough to be worth a compression call"""
+        threshold = int(target_tokens * self.PASSTHROUGH_RATIO)
+        return self.estimate_tokens(code_files, limit=threshold) >= threshold
+
+    def uncompressed_result(self, code_files: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build a compress_code-shaped result that passes code files through unchanged"""
+        combined_code = self._combine_code_files(code_files)
+        tokens = self.estimate_tokens(code_files)
+        return {
+            'compressed_code': combined_code,
+            'original_tokens': tokens,
+            'compressed_tokens': tokens,
+            'compression_ratio': 0.0,
+            'file_mapping': self._create_file_mapping(code_files, combined_code)
+        }
+
     def _combine_code_files(self, code_files: List[Dict[str, Any]]) -> str:
         """Combine code files into a single string with file markers"""
         combined = []
@@ -147,6 +202,7 @@ class CompressionService:
             'original_tokens': len(self._combine_code_files(code_files)) // 4,
             'compressed_tokens': len(compressed) // 4,
             'compression_ratio': len(compressed) / len(self._combine_code_files(code_files)),
+            'fallback': True,
             'file_mapping': {
                 'total_files': len(code_files),
                 'included_files': len([c for c in combined if 'FILE:' in c and 'TRUNCATED' not in c]),
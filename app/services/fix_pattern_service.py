@@ -5,11 +5,17 @@ import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from pathlib import Path
+from cachetools import TTLCache
 
 from app.core.database import MongoDB
 
 logger = logging.getLogger(__name__)
 
+# Per-process cache of pattern lookups keyed by (type, extension, severity, limit).
+# Regeneration iterations for the same PR repeat the same keys; new approvals show
+# up within the TTL (immediately in the process that stored them).
+_similar_patterns_cache: TTLCache = TTLCache(maxsize=1024, ttl=300)
+
 
 class FixPatternService:
     """MongoDB-based RAG for successful fix patterns"""
@@ -67,6 +73,8 @@ class FixPatternService:
                         '$push': {'analysis_ids': analysis_id}
                     }
                 )
+                # Cached lookups in this process may now rank patterns differently
+                _similar_patterns_cache.clear()
                 logger.info(f"Incremented success count for existing pattern {existing_pattern['id']}")
                 return existing_pattern['id']
 
@@ -90,6 +98,7 @@ class FixPatternService:
             }
 
             await db.fix_patterns.insert_one(pattern)
+            _similar_patterns_cache.clear()
             logger.info(f"Stored new fix pattern {pattern_id} for {vulnerability_type}")
 
             return pattern_id
@@ -117,6 +126,11 @@ class FixPatternService:
         Returns:
             List of fix patterns sorted by success count
         """
+        cache_key = (vulnerability_type, file_extension, severity, limit)
+        cached = _similar_patterns_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
         try:
             db = MongoDB.get_database()
 
@@ -139,8 +153,8 @@ class FixPatternService:
                 f"in {file_extension} files"
             )
 
-            # Return only relevant fields
-            return [
+            # Keep only relevant fields
+            results = [
                 {
                     'pattern_id': p['id'],
                     'vulnerability_type': p['vulnerability_type'],
@@ -153,6 +167,8 @@ class FixPatternService:
                 }
                 for p in patterns
             ]
+            _similar_patterns_cache[cache_key] = results
+            return list(results)
 
         except Exception as e:
             logger.error(f"Error retrieving similar patterns: {e}")
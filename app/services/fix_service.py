@@ -1,6 +1,7 @@
 """Service for generating automated security fixes"""
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+import asyncio
 import logging
 
 from app.core.config import settings
@@ -12,30 +13,29 @@ logger = logging.getLogger(__name__)
 class FixService:
     """Service for generating automated fixes for security vulnerabilities"""
 
+    # Concurrent per-file LLM calls, to stay within provider rate limits
+    FIX_CONCURRENCY = 4
+
     def __init__(self):
         self.llm_client = LLMClient()
 
-    async def generate_fixes(
+    async def _generate_per_file(
         self,
         vulnerabilities: List[Dict[str, Any]],
         code_files: List[Dict[str, Any]],
-        repo_path: str
+        generate_fix: Callable[[str, str, List[Dict[str, Any]]], Awaitable[Optional[Dict[str, Any]]]]
     ) -> List[Dict[str, Any]]:
         """
-        Generate automated fixes for detected vulnerabilities
+        Group vulnerabilities by file and generate one fix per file concurrently
 
         Args:
             vulnerabilities: List of vulnerability findings
             code_files: Original code files
-            repo_path: Path to cloned repository
+            generate_fix: Coroutine taking (file_path, original_content, file_vulns)
 
         Returns:
-            List of fixes with file_path, fixed_content, and description
+            Fixes in file order, skipping files that are missing or failed
         """
-        logger.info(f"Generating fixes for {len(vulnerabilities)} vulnerabilities")
-
-        fixes = []
-
         # Group vulnerabilities by file
         vulns_by_file = {}
         for vuln in vulnerabilities:
@@ -44,32 +44,55 @@ class FixService:
                 vulns_by_file[file_path] = []
             vulns_by_file[file_path].append(vuln)
 
-        # Generate fixes for each file
-        for file_path, file_vulns in vulns_by_file.items():
-            try:
-                # Find original file content
-                original_file = next(
-                    (f for f in code_files if f['path'] == file_path),
-                    None
-                )
-
-                if not original_file:
-                    logger.warning(f"Could not find original file: {file_path}")
-                    continue
-
-                # Generate fix for this file
-                fix = await self._generate_file_fix(
-                    file_path=file_path,
-                    original_content=original_file['content'],
-                    vulnerabilities=file_vulns
-                )
-
-                if fix:
-                    fixes.append(fix)
+        contents = {f['path']: f['content'] for f in code_files}
+        semaphore = asyncio.Semaphore(self.FIX_CONCURRENCY)
 
+        async def fix_file(file_path: str, file_vulns: List[Dict[str, Any]]):
+            if file_path not in contents:
+                logger.warning(f"Could not find original file: {file_path}")
+                return None
+
+            try:
+                async with semaphore:
+                    return await generate_fix(file_path, contents[file_path], file_vulns)
             except Exception as e:
                 logger.error(f"Error generating fix for {file_path}: {e}")
-                continue
+                return None
+
+        results = await asyncio.gather(
+            *(fix_file(file_path, file_vulns) for file_path, file_vulns in vulns_by_file.items())
+        )
+        return [fix for fix in results if fix]
+
+    async def generate_fixes(
+        self,
+        vulnerabilities: List[Dict[str, Any]],
+        code_files: List[Dict[str, Any]],
+        repo_path: str
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate automated fixes for detected vulnerabilities
+
+        Args:
+            vulnerabilities: List of vulnerability findings
+            code_files: Original code files
+            repo_path: Path to cloned repository
+
+        Returns:
+            List of fixes with file_path, fixed_content, and description
+        """
+        logger.info(f"Generating fixes for {len(vulnerabilities)} vulnerabilities")
+
+        # Generate fixes for each file
+        fixes = await self._generate_per_file(
+            vulnerabilities,
+            code_files,
+            lambda file_path, original_content, file_vulns: self._generate_file_fix(
+                file_path=file_path,
+                original_content=original_content,
+                vulnerabilities=file_vulns
+            )
+        )
 
         logger.info(f"Generated {len(fixes)} fixes")
         return fixes
@@ -216,45 +239,19 @@ Provide the complete fixed file content with all vulnerabilities addressed."""
             f"Generating fixes with RL guidance for {len(vulnerabilities)} vulnerabilities"
         )
 
-        fixes = []
-
-        # Group vulnerabilities by file
-        vulns_by_file = {}
-        for vuln in vulnerabilities:
-            file_path = vuln['file_path']
-            if file_path not in vulns_by_file:
-                vulns_by_file[file_path] = []
-            vulns_by_file[file_path].append(vuln)
-
-        # Generate fixes for each file
-        for file_path, file_vulns in vulns_by_file.items():
-            try:
-                # Find original file content
-                original_file = next(
-                    (f for f in code_files if f['path'] == file_path),
-                    None
-                )
-
-                if not original_file:
-                    logger.warning(f"Could not find original file: {file_path}")
-                    continue
-
-                # Generate fix with RL guidance
-                fix = await self._generate_file_fix_with_guidance(
-                    file_path=file_path,
-                    original_content=original_file['content'],
-                    vulnerabilities=file_vulns,
-                    feedback_context=feedback_context,
-                    rl_guidance=rl_guidance,
-                    rag_patterns=rag_patterns
-                )
-
-                if fix:
-                    fixes.append(fix)
-
-            except Exception as e:
-                logger.error(f"Error generating fix for {file_path}: {e}")
-                continue
+        # Generate fixes with RL guidance for each file
+        fixes = await self._generate_per_file(
+            vulnerabilities,
+            code_files,
+            lambda file_path, original_content, file_vulns: self._generate_file_fix_with_guidance(
+                file_path=file_path,
+                original_content=original_content,
+                vulnerabilities=file_vulns,
+                feedback_context=feedback_context,
+                rl_guidance=rl_guidance,
+                rag_patterns=rag_patterns
+            )
+        )
 
         logger.info(f"Generated {len(fixes)} fixes with RL guidance")
         return fixes
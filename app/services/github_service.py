@@ -2,9 +2,12 @@
 
 from github import Github, Auth, GithubIntegration
 from github.GithubException import GithubException
+import asyncio
 import git
+import os
 import tempfile
 import shutil
+import threading
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 from datetime import datetime
@@ -18,6 +21,18 @@ logger = logging.getLogger(__name__)
 class GitHubService:
     """Service for GitHub operations"""
 
+    CODE_EXTENSIONS = {
+        '.py', '.js', '.ts', '.jsx', '.tsx', '.java', '.go', '.rs',
+        '.c', '.cpp', '.h', '.hpp', '.cs', '.rb', '.php', '.swift',
+        '.kt', '.scala', '.sh', '.sql', '.yaml', '.yml', '.json'
+    }
+
+    # Common non-source directories
+    SKIP_DIRS = {'node_modules', 'venv', 'env', '__pycache__', 'build', 'dist', '.git'}
+
+    # Concurrent file reads when loading a cloned repository
+    READ_CONCURRENCY = 32
+
     def __init__(self):
         """Initialize GitHub client"""
         # Read private key from file
@@ -30,23 +45,44 @@ class GitHubService:
         auth = Auth.AppAuth(self.app_id, self.private_key)
         self.github = Github(auth=auth)
 
+        # Installation IDs by lowercased owner, shared by all threads
+        self._installation_ids: Dict[str, int] = {}
+
+        # Installation clients by lowercased owner, one set per thread. A PyGithub
+        # client keeps a single persistent connection that isn't safe to share
+        # between threads, but within a thread it reuses connections and TLS
+        # across calls and refreshes its installation token when it expires.
+        self._thread_clients = threading.local()
+
     def get_installation_client(self, repo_full_name: str) -> Github:
-        """Get GitHub client for a specific installation"""
-        owner = repo_full_name.split("/")[0]
+        """Get GitHub client for a specific installation (cached per owner and thread)"""
+        owner = repo_full_name.split("/")[0].lower()
+        clients: Optional[Dict[str, Github]] = getattr(self._thread_clients, "clients", None)
+        if clients is None:
+            clients = self._thread_clients.clients = {}
+        client = clients.get(owner)
+        if client is not None:
+            return client
 
         integration = GithubIntegration(
             self.app_id,
             self.private_key,
         )
 
-        for installation in integration.get_installations():
-            # Access account info from raw_data
-            account = installation.raw_data.get("account", {})
-            account_login = account.get("login", "")
-            if account_login.lower() == owner.lower():
-                return integration.get_github_for_installation(installation.id)
-
-        raise Exception(f"No installation found for repo owner {owner}")
+        installation_id = self._installation_ids.get(owner)
+        if installation_id is None:
+            for installation in integration.get_installations():
+                # Access account info from raw_data
+                account = installation.raw_data.get("account", {})
+                account_login = account.get("login", "")
+                if account_login.lower() == owner:
+                    installation_id = self._installation_ids[owner] = installation.id
+                    break
+            else:
+                raise Exception(f"No installation found for repo owner {owner}")
+
+        client = clients[owner] = integration.get_github_for_installation(installation_id)
+        return client
 
     async def clone_repository(
         self,
@@ -59,16 +95,14 @@ class GitHubService:
 
         Returns path to cloned repository
         """
+        temp_dir = None
         try:
             # Create temporary directory
             temp_dir = tempfile.mkdtemp(prefix="protectsus_")
             logger.info(f"Cloning {repo_full_name} at {commit_sha} to {temp_dir}")
 
-            # Clone repository
-            repo = git.Repo.clone_from(clone_url, temp_dir)
-
-            # Checkout specific commit
-            repo.git.checkout(commit_sha)
+            # Clone and checkout in a worker thread so the event loop stays free
+            await asyncio.to_thread(self._clone_at_commit, clone_url, temp_dir, commit_sha)
 
             logger.info(f"Successfully cloned repository to {temp_dir}")
             return temp_dir
@@ -79,50 +113,30 @@ class GitHubService:
                 shutil.rmtree(temp_dir)
             raise
 
+    @staticmethod
+    def _clone_at_commit(clone_url: str, target_dir: str, commit_sha: str):
+        """Clone a repository and checkout a specific commit (blocking)"""
+        repo = git.Repo.clone_from(clone_url, target_dir)
+        repo.git.checkout(commit_sha)
+
     async def get_code_files(self, repo_path: str) -> List[Dict[str, Any]]:
         """
         Get all code files from repository
 
         Returns list of files with path and content
         """
-        code_files = []
-        code_extensions = {
-            '.py', '.js', '.ts', '.jsx', '.tsx', '.java', '.go', '.rs',
-            '.c', '.cpp', '.h', '.hpp', '.cs', '.rb', '.php', '.swift',
-            '.kt', '.scala', '.sh', '.sql', '.yaml', '.yml', '.json'
-        }
-
         try:
-            repo_path_obj = Path(repo_path)
+            paths = await asyncio.to_thread(self._walk_code_paths, repo_path)
 
-            for file_path in repo_path_obj.rglob('*'):
-                # Skip directories, hidden files, and non-code files
-                if file_path.is_dir():
-                    continue
-                if any(part.startswith('.') for part in file_path.parts):
-                    continue
-                if file_path.suffix not in code_extensions:
-                    continue
+            # Pipeline disk reads instead of reading files one after another
+            semaphore = asyncio.Semaphore(self.READ_CONCURRENCY)
 
-                # Skip common non-source directories
-                skip_dirs = {'node_modules', 'venv', 'env', '__pycache__', 'build', 'dist', '.git'}
-                if any(skip_dir in file_path.parts for skip_dir in skip_dirs):
-                    continue
+            async def read(file_path: str) -> Optional[Dict[str, Any]]:
+                async with semaphore:
+                    return await asyncio.to_thread(self._read_code_file, repo_path, file_path)
 
-                try:
-                    # Read file content
-                    content = file_path.read_text(encoding='utf-8')
-                    relative_path = file_path.relative_to(repo_path_obj)
-
-                    code_files.append({
-                        'path': str(relative_path),
-                        'content': content,
-                        'size': len(content),
-                        'extension': file_path.suffix
-                    })
-                except (UnicodeDecodeError, PermissionError) as e:
-                    logger.warning(f"Skipping file {file_path}: {e}")
-                    continue
+            results = await asyncio.gather(*(read(p) for p in paths))
+            code_files = [f for f in results if f is not None]
 
             logger.info(f"Found {len(code_files)} code files")
             return code_files
@@ -131,6 +145,39 @@ class GitHubService:
             logger.error(f"Error reading code files: {e}")
             raise
 
+    def _walk_code_paths(self, repo_path: str) -> List[str]:
+        """List code file paths in a repository, pruning hidden and skipped directories (blocking)"""
+        paths = []
+        for dirpath, dirnames, filenames in os.walk(repo_path):
+            # Prune in place so os.walk never descends into e.g. node_modules
+            dirnames[:] = [
+                d for d in dirnames
+                if not d.startswith('.') and d not in self.SKIP_DIRS
+            ]
+            for filename in filenames:
+                if filename.startswith('.'):
+                    continue
+                if os.path.splitext(filename)[1] not in self.CODE_EXTENSIONS:
+                    continue
+                paths.append(os.path.join(dirpath, filename))
+        return paths
+
+    def _read_code_file(self, repo_path: str, file_path: str) -> Optional[Dict[str, Any]]:
+        """Read one code file, or None if it isn't readable UTF-8 (blocking)"""
+        try:
+            with open(file_path, encoding='utf-8') as f:
+                content = f.read()
+        except (UnicodeDecodeError, PermissionError) as e:
+            logger.warning(f"Skipping file {file_path}: {e}")
+            return None
+
+        return {
+            'path': os.path.relpath(file_path, repo_path),
+            'content': content,
+            'size': len(content),
+            'extension': os.path.splitext(file_path)[1]
+        }
+
     async def create_fix_pr(
         self,
         repo_full_name: str,
@@ -266,10 +313,8 @@ class GitHubService:
     ):
         """Add a comment to a pull request"""
         try:
-            gh = self.get_installation_client(repo_full_name)
-            repo = gh.get_repo(repo_full_name)
-            pr = repo.get_pull(pr_number)
-            pr.create_issue_comment(comment)
+            # PyGithub is blocking; keep the event loop free for concurrent steps
+            await asyncio.to_thread(self._create_pr_comment, repo_full_name, pr_number, comment)
             logger.info(f"Added comment to PR #{pr_number}")
         except Exception as e:
             logger.error(f"Error adding PR comment: {e}")
@@ -283,15 +328,24 @@ class GitHubService:
     ):
         """Add a comment to a commit"""
         try:
-            gh = self.get_installation_client(repo_full_name)
-            repo = gh.get_repo(repo_full_name)
-            commit = repo.get_commit(commit_sha)
-            commit.create_comment(comment)
+            await asyncio.to_thread(self._create_commit_comment, repo_full_name, commit_sha, comment)
             logger.info(f"Added comment to commit {commit_sha[:7]}")
         except Exception as e:
             logger.error(f"Error adding commit comment: {e}")
             raise
 
+    def _create_pr_comment(self, repo_full_name: str, pr_number: int, comment: str):
+        """Blocking PyGithub call behind add_pr_comment"""
+        gh = self.get_installation_client(repo_full_name)
+        repo = gh.get_repo(repo_full_name)
+        repo.get_pull(pr_number).create_issue_comment(comment)
+
+    def _create_commit_comment(self, repo_full_name: str, commit_sha: str, comment: str):
+        """Blocking PyGithub call behind add_commit_comment"""
+        gh = self.get_installation_client(repo_full_name)
+        repo = gh.get_repo(repo_full_name)
+        repo.get_commit(commit_sha).create_comment(comment)
+
     def cleanup_repo(self, repo_path: str):
         """Clean up cloned repository"""
         try:
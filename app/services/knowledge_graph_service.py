@@ -2,8 +2,15 @@
 
 from typing import Dict, Any, List, Optional
 from neo4j import AsyncSession
+from bisect import bisect_right
+import asyncio
+import csv
 import logging
+import os
+import shutil
+import uuid
 
+from app.core.config import settings
 from app.core.database import Neo4jDB
 
 logger = logging.getLogger(__name__)
@@ -12,6 +19,107 @@ logger = logging.getLogger(__name__)
 class KnowledgeGraphService:
     """Service for managing knowledge graph of code relationships"""
 
+    # Rows per UNWIND query during bulk ingest
+    BULK_BATCH_SIZE = 1000
+
+    # Rows per committed transaction during bulk ingest, to stay well under
+    # Neo4j's per-transaction memory limit on large repositories
+    BULK_TRANSACTION_ROWS = 10000
+
+    # Indexes backing the MERGE lookups in bulk_ingest
+    INDEX_STATEMENTS = (
+        "CREATE CONSTRAINT repo_unique IF NOT EXISTS FOR (r:Repository) REQUIRE r.full_name IS UNIQUE",
+        "CREATE INDEX file_repo_path_idx IF NOT EXISTS FOR (f:File) ON (f.repository, f.path)",
+        "CREATE INDEX function_repo_file_name_idx IF NOT EXISTS FOR (fn:Function) ON (fn.repository, fn.file_path, fn.name)",
+        "CREATE INDEX function_repo_name_idx IF NOT EXISTS FOR (fn:Function) ON (fn.repository, fn.name)",
+        "CREATE INDEX class_repo_name_idx IF NOT EXISTS FOR (c:Class) ON (c.repository, c.name)",
+        "CREATE INDEX module_name_idx IF NOT EXISTS FOR (m:Module) ON (m.name)",
+    )
+
+    REPOSITORY_UPSERT_QUERY = """
+        MERGE (r:Repository {full_name: $repo_full_name})
+        ON CREATE SET r.name = $repo_name,
+                      r.owner = $repo_owner,
+                      r.created_at = datetime()
+        SET r.updated_at = datetime(),
+            r.indexed_at = datetime()
+    """
+
+    # Rows per apoc.periodic.iterate batch for CSV imports
+    CSV_BATCH_SIZE = 10000
+
+    # (csv file, per-row statement) in dependency order for bulk_import_csv
+    CSV_IMPORT_STATEMENTS = (
+        ("files.csv", """
+            MATCH (r:Repository {full_name: $repo_full_name})
+            MERGE (f:File {path: row.path, repository: $repo_full_name})
+            SET f.language = coalesce(row.language, f.language),
+                f.line_count = coalesce(toInteger(row.line_count), f.line_count),
+                f.extension = coalesce(row.extension, f.extension),
+                f.size = coalesce(toInteger(row.size), f.size),
+                f.updated_at = datetime()
+            MERGE (r)-[:CONTAINS]->(f)
+        """),
+        ("functions.csv", """
+            MATCH (f:File {path: row.file_path, repository: $repo_full_name})
+            MERGE (fn:Function {name: row.name, file_path: row.file_path, repository: $repo_full_name})
+            SET fn.line_start = toInteger(row.line_start),
+                fn.line_end = toInteger(row.line_end),
+                fn.is_async = row.is_async = 'true',
+                fn.args = [arg IN split(coalesce(row.args, ''), ';') WHERE arg <> ''],
+                fn.updated_at = datetime()
+            MERGE (f)-[:DEFINES]->(fn)
+        """),
+        ("classes.csv", """
+            MATCH (f:File {path: row.file_path, repository: $repo_full_name})
+            MERGE (c:Class {name: row.name, file_path: row.file_path, repository: $repo_full_name})
+            SET c.line_start = toInteger(row.line_start),
+                c.line_end = toInteger(row.line_end),
+                c.bases = [base IN split(coalesce(row.bases, ''), ';') WHERE base <> ''],
+                c.methods = [method IN split(coalesce(row.methods, ''), ';') WHERE method <> ''],
+                c.updated_at = datetime()
+            MERGE (f)-[:DEFINES]->(c)
+        """),
+        ("rels_extends.csv", """
+            MATCH (s:Class {repository: $repo_full_name, file_path: row.source_file, name: row.source_name})
+            MERGE (t:Class {name: row.target_name, repository: $repo_full_name})
+            MERGE (s)-[:EXTENDS]->(t)
+        """),
+        ("rels_imports.csv", """
+            MATCH (s:File {path: row.source_file, repository: $repo_full_name})
+            MERGE (t:Module {name: row.target_name})
+            MERGE (s)-[:IMPORTS]->(t)
+        """),
+        ("rels_calls.csv", """
+            MATCH (s:Function {repository: $repo_full_name, file_path: row.source_file, name: row.source_name})
+            MERGE (t:Function {name: row.target_name, repository: $repo_full_name})
+            MERGE (s)-[:CALLS]->(t)
+        """),
+    )
+
+    # One UNWIND query per relationship type; every row is an explicit
+    # {source_file, source_name, target_name} pair so each MATCH is an index seek
+    EDGE_QUERIES = {
+        "CALLS": """
+            UNWIND $rows AS e
+            MATCH (s:Function {repository: $repo_full_name, file_path: e.source_file, name: e.source_name})
+            MERGE (t:Function {name: e.target_name, repository: $repo_full_name})
+            MERGE (s)-[:CALLS]->(t)
+        """,
+        "IMPORTS": """
+            UNWIND $rows AS e
+            MATCH (s:File {path: e.source_file, repository: $repo_full_name})
+            MERGE (t:Module {name: e.target_name})
+            MERGE (s)-[:IMPORTS]->(t)
+        """,
+        "EXTENDS": """
+            UNWIND $rows AS e
+            MATCH (s:Class {repository: $repo_full_name, file_path: e.source_file, name: e.source_name})
+            MERGE (t:Class {name: e.target_name, repository: $repo_full_name})
+            MERGE (s)-[:EXTENDS]->(t)
+        """,
+    }
+
     @staticmethod
     async def create_repository_node(
         repo_full_name: str,
@@ -53,21 +161,26 @@ class KnowledgeGraphService:
             driver = Neo4jDB.get_driver()
 
             async with driver.session() as session:
-                for file in files:
-                    await session.run(
-                        """
-                        MATCH (r:Repository {full_name: $repo_full_name})
-                        MERGE (f:File {path: $path, repository: $repo_full_name})
-                        SET f.extension = $extension,
-                            f.size = $size,
-                            f.updated_at = datetime()
-                        MERGE (r)-[:CONTAINS]->(f)
-                        """,
-                        repo_full_name=repo_full_name,
-                        path=file['path'],
-                        extension=file.get('extension', ''),
-                        size=file.get('size', 0)
-                    )
+                await session.run(
+                    """
+                    MATCH (r:Repository {full_name: $repo_full_name})
+                    UNWIND $rows AS row
+                    MERGE (f:File {path: row.path, repository: $repo_full_name})
+                    SET f.extension = row.extension,
+                        f.size = row.size,
+                        f.updated_at = datetime()
+                    MERGE (r)-[:CONTAINS]->(f)
+                    """,
+                    repo_full_name=repo_full_name,
+                    rows=[
+                        {
+                            "path": file['path'],
+                            "extension": file.get('extension', ''),
+                            "size": file.get('size', 0)
+                        }
+                        for file in files
+                    ]
+                )
 
             logger.info(f"Created {len(files)} file nodes")
 
@@ -482,161 +595,446 @@ class KnowledgeGraphService:
             return {"nodes": [], "edges": [], "stats": {}}
 
     @staticmethod
-    async def index_codebase(
+    async def ensure_indexes():
+        """
+        Idempotently create the indexes the bulk ingest MERGEs rely on.
+
+        Safe to call on every worker start; each statement is IF NOT EXISTS.
+        """
+        try:
+            driver = Neo4jDB.get_driver()
+
+            async with driver.session() as session:
+                for statement in KnowledgeGraphService.INDEX_STATEMENTS:
+                    await session.run(statement)
+
+            logger.info("Ensured knowledge graph indexes")
+
+        except Exception as e:
+            logger.error(f"Error ensuring knowledge graph indexes: {e}")
+            raise
+
+    @staticmethod
+    async def _run_statements(tx, statements: List[tuple]):
+        """Run (query, params, row_count) statements in order within one transaction"""
+        for query, params, _ in statements:
+            result = await tx.run(query, **params)
+            await result.consume()
+
+    @staticmethod
+    def _build_node_rows(
+        code_structure: Dict[str, Any],
+        code_files: Optional[List[Dict[str, Any]]] = None
+    ) -> tuple:
+        """
+        Flatten the parsed structure into File, Function and Class rows.
+
+        Files come back as parallel columns (paths, languages, line_counts,
+        extensions, sizes) rather than one dict per file; None marks a value
+        the source didn't provide.
+        """
+        # Merge the parsed structure and the raw files by path
+        structure_files = {f["path"]: f for f in code_structure.get("files", [])}
+        raw_files = {f["path"]: f for f in code_files or []}
+        paths = list(structure_files)
+        paths.extend(path for path in raw_files if path not in structure_files)
+
+        files = {
+            "paths": paths,
+            "languages": [
+                structure_files[path].get("language", "unknown") if path in structure_files else None
+                for path in paths
+            ],
+            "line_counts": [
+                structure_files[path].get("line_count", 0) if path in structure_files else None
+                for path in paths
+            ],
+            "extensions": [
+                raw_files[path].get("extension", "") if path in raw_files else None
+                for path in paths
+            ],
+            "sizes": [
+                raw_files[path].get("size", 0) if path in raw_files else None
+                for path in paths
+            ],
+        }
+
+        functions = [
+            {
+                "file_path": func_info["file_path"],
+                "name": func_info["name"],
+                "line_start": func_info.get("line_start", 0),
+                "line_end": func_info.get("line_end", 0),
+                "is_async": func_info.get("is_async", False),
+                "args": func_info.get("args", [])
+            }
+            for func_info in code_structure.get("functions", [])
+        ]
+
+        classes = [
+            {
+                "file_path": class_info["file_path"],
+                "name": class_info["name"],
+                "line_start": class_info.get("line_start", 0),
+                "line_end": class_info.get("line_end", 0),
+                "bases": class_info.get("bases", []),
+                "methods": class_info.get("methods", [])
+            }
+            for class_info in code_structure.get("classes", [])
+        ]
+
+        return files, functions, classes
+
+    @staticmethod
+    def build_edge_pairs(code_structure: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Materialize CALLS/IMPORTS/EXTENDS as explicit source/target pairs.
+
+        Calls are attributed to the closest preceding function in the same
+        file here, rather than by a per-row MATCH and sort in Cypher.
+
+        Args:
+            code_structure: Parsed code structure from CodeParserService
+
+        Returns:
+            Dict of relationship type to a list of
+            {source_file, source_name, target_name, line} pairs
+        """
+        functions_by_file: Dict[str, List[tuple]] = {}
+        for func_info in code_structure.get("functions", []):
+            functions_by_file.setdefault(func_info["file_path"], []).append(
+                (func_info.get("line_start", 0), func_info["name"])
+            )
+        for funcs in functions_by_file.values():
+            funcs.sort(key=lambda item: item[0])
+        line_starts = {
+            path: [line for line, _ in funcs]
+            for path, funcs in functions_by_file.items()
+        }
+
+        calls = []
+        for call_info in code_structure.get("calls", []):
+            file_path = call_info["file_path"]
+            line = call_info.get("line", 0)
+            pos = bisect_right(line_starts.get(file_path, []), line)
+            if not pos:
+                continue
+            calls.append({
+                "source_file": file_path,
+                "source_name": functions_by_file[file_path][pos - 1][1],
+                "target_name": call_info["name"],
+                "line": line
+            })
+
+        imports = [
+            {
+                "source_file": import_info["file_path"],
+                "target_name": import_info["module"],
+                "line": import_info.get("line", 0)
+            }
+            for import_info in code_structure.get("imports", [])
+            if import_info.get("module")
+        ]
+
+        extends = [
+            {
+                "source_file": class_info["file_path"],
+                "source_name": class_info["name"],
+                "target_name": base,
+                "line": class_info.get("line_start", 0)
+            }
+            for class_info in code_structure.get("classes", [])
+            for base in class_info.get("bases", [])
+        ]
+
+        return {"EXTENDS": extends, "IMPORTS": imports, "CALLS": calls}
+
+    @staticmethod
+    async def bulk_ingest(
         repo_full_name: str,
-        code_structure: Dict[str, Any]
+        code_structure: Dict[str, Any],
+        code_files: Optional[List[Dict[str, Any]]] = None,
+        batch_size: int = BULK_BATCH_SIZE,
+        transaction_rows: int = BULK_TRANSACTION_ROWS
     ):
         """
-        Index the entire codebase structure in Neo4j.
-        
-        Creates nodes for Files, Functions, Classes, and their relationships.
-        
+        Write a repository's whole code structure in UNWIND batches.
+
+        Each label/relationship is sent as UNWIND batches instead of one
+        query per node, so a repo costs a handful of round trips. Batches are
+        committed in order, roughly every transaction_rows rows, so a large
+        repo never builds one huge transaction; every write is a MERGE, so a
+        retried or partially applied ingest converges on the same graph.
+
         Args:
             repo_full_name: Full repository name (owner/repo)
             code_structure: Parsed code structure from CodeParserService
+            code_files: Optional raw code files; their extension/size are
+                merged onto the File nodes
+            batch_size: Rows per UNWIND query
+            transaction_rows: Rows per committed transaction
         """
+        files, functions, classes = KnowledgeGraphService._build_node_rows(
+            code_structure, code_files
+        )
+        edges = KnowledgeGraphService.build_edge_pairs(code_structure)
+
+        # (query, params, row_count) in write order: files before the nodes
+        # and edges that MATCH them
+        statements = [(
+            KnowledgeGraphService.REPOSITORY_UPSERT_QUERY,
+            {
+                "repo_full_name": repo_full_name,
+                "repo_name": repo_full_name.split("/")[-1],
+                "repo_owner": repo_full_name.split("/")[0]
+            },
+            1
+        )]
+
+        # Files go over Bolt as parallel arrays, not one map per file
+        paths = files["paths"]
+        for start in range(0, len(paths), batch_size):
+            columns = {
+                name: values[start:start + batch_size]
+                for name, values in files.items()
+            }
+            statements.append((
+                """
+                MATCH (r:Repository {full_name: $repo_full_name})
+                UNWIND range(0, size($paths) - 1) AS i
+                MERGE (f:File {path: $paths[i], repository: $repo_full_name})
+                SET f.language = coalesce($languages[i], f.language),
+                    f.line_count = coalesce($line_counts[i], f.line_count),
+                    f.extension = coalesce($extensions[i], f.extension),
+                    f.size = coalesce($sizes[i], f.size),
+                    f.updated_at = datetime()
+                MERGE (r)-[:CONTAINS]->(f)
+                """,
+                {"repo_full_name": repo_full_name, **columns},
+                len(columns["paths"])
+            ))
+
+        row_queries = [
+            (
+                """
+                UNWIND $rows AS row
+                MATCH (f:File {path: row.file_path, repository: $repo_full_name})
+                MERGE (fn:Function {
+                    name: row.name,
+                    file_path: row.file_path,
+                    repository: $repo_full_name
+                })
+                SET fn.line_start = row.line_start,
+                    fn.line_end = row.line_end,
+                    fn.is_async = row.is_async,
+                    fn.args = row.args,
+                    fn.updated_at = datetime()
+                MERGE (f)-[:DEFINES]->(fn)
+                """,
+                functions
+            ),
+            (
+                """
+                UNWIND $rows AS row
+                MATCH (f:File {path: row.file_path, repository: $repo_full_name})
+                MERGE (c:Class {
+                    name: row.name,
+                    file_path: row.file_path,
+                    repository: $repo_full_name
+                })
+                SET c.line_start = row.line_start,
+                    c.line_end = row.line_end,
+                    c.bases = row.bases,
+                    c.methods = row.methods,
+                    c.updated_at = datetime()
+                MERGE (f)-[:DEFINES]->(c)
+                """,
+                classes
+            ),
+            *(
+                (KnowledgeGraphService.EDGE_QUERIES[rel_type], pairs)
+                for rel_type, pairs in edges.items()
+            )
+        ]
+        for query, rows in row_queries:
+            for start in range(0, len(rows), batch_size):
+                chunk = rows[start:start + batch_size]
+                statements.append((
+                    query,
+                    {"rows": chunk, "repo_full_name": repo_full_name},
+                    len(chunk)
+                ))
+
         try:
             driver = Neo4jDB.get_driver()
-            
+
             async with driver.session() as session:
-                # Ensure repository exists
-                await session.run(
-                    """
-                    MERGE (r:Repository {full_name: $repo_full_name})
-                    ON CREATE SET r.name = $repo_name,
-                                  r.owner = $repo_owner,
-                                  r.created_at = datetime()
-                    SET r.updated_at = datetime(),
-                        r.indexed_at = datetime()
-                    """,
+                group, group_rows = [], 0
+                for statement in statements:
+                    group.append(statement)
+                    group_rows += statement[2]
+                    if group_rows >= transaction_rows:
+                        await session.execute_write(KnowledgeGraphService._run_statements, group)
+                        group, group_rows = [], 0
+                if group:
+                    await session.execute_write(KnowledgeGraphService._run_statements, group)
+
+            stats = {
+                "files": len(files["paths"]),
+                "functions": len(functions),
+                "classes": len(classes),
+                "imports": len(edges["IMPORTS"]),
+                "calls": len(edges["CALLS"])
+            }
+            logger.info(f"Indexed codebase for {repo_full_name}: {stats}")
+
+        except Exception as e:
+            logger.error(f"Error indexing codebase: {e}")
+            raise
+
+    @staticmethod
+    def _write_import_csvs(
+        import_dir: str,
+        files: List[Dict[str, Any]],
+        functions: List[Dict[str, Any]],
+        classes: List[Dict[str, Any]],
+        edges: Dict[str, List[Dict[str, Any]]]
+    ) -> List[str]:
+        """Write node and edge CSVs for LOAD CSV; returns the written file names"""
+        tables = {
+            "files.csv": (
+                ["path", "language", "line_count", "extension", "size"],
+                [
+                    dict(zip(("path", "language", "line_count", "extension", "size"), values))
+                    for values in zip(
+                        files["paths"], files["languages"], files["line_counts"],
+                        files["extensions"], files["sizes"]
+                    )
+                ]
+            ),
+            "functions.csv": (
+                ["file_path", "name", "line_start", "line_end", "is_async", "args"],
+                [
+                    {**row, "is_async": str(bool(row["is_async"])).lower(), "args": ";".join(row["args"])}
+                    for row in functions
+                ]
+            ),
+            "classes.csv": (
+                ["file_path", "name", "line_start", "line_end", "bases", "methods"],
+                [
+                    {**row, "bases": ";".join(row["bases"]), "methods": ";".join(row["methods"])}
+                    for row in classes
+                ]
+            ),
+        }
+        for rel_type, pairs in edges.items():
+            tables[f"rels_{rel_type.lower()}.csv"] = (
+                ["source_file", "source_name", "target_name", "line"],
+                pairs
+            )
+
+        written = []
+        for name, (fieldnames, rows) in tables.items():
+            if not rows:
+                continue
+            with open(os.path.join(import_dir, name), "w", newline="") as handle:
+                writer = csv.DictWriter(handle, fieldnames=fieldnames, extrasaction="ignore")
+                writer.writeheader()
+                writer.writerows(rows)
+            written.append(name)
+        return written
+
+    @staticmethod
+    async def bulk_import_csv(
+        repo_full_name: str,
+        code_structure: Dict[str, Any],
+        code_files: Optional[List[Dict[str, Any]]] = None
+    ):
+        """
+        Bulk-load a large repository via CSV files and apoc.periodic.iterate.
+
+        Used for big first-time indexes where even batched transactional
+        MERGEs are bound by transaction commits. Requires NEO4J_IMPORT_DIR
+        to point at a directory Neo4j serves as file:/// and APOC.
+
+        Args:
+            repo_full_name: Full repository name (owner/repo)
+            code_structure: Parsed code structure from CodeParserService
+            code_files: Optional raw code files for File extension/size
+        """
+        files, functions, classes = KnowledgeGraphService._build_node_rows(
+            code_structure, code_files
+        )
+        edges = KnowledgeGraphService.build_edge_pairs(code_structure)
+
+        batch_dir = f"protectsus_{uuid.uuid4().hex}"
+        local_dir = os.path.join(settings.NEO4J_IMPORT_DIR, batch_dir)
+
+        try:
+            os.makedirs(local_dir)
+            written = await asyncio.to_thread(
+                KnowledgeGraphService._write_import_csvs,
+                local_dir, files, functions, classes, edges
+            )
+
+            driver = Neo4jDB.get_driver()
+            async with driver.session() as session:
+                result = await session.run(
+                    KnowledgeGraphService.REPOSITORY_UPSERT_QUERY,
                     repo_full_name=repo_full_name,
                     repo_name=repo_full_name.split("/")[-1],
                     repo_owner=repo_full_name.split("/")[0]
                 )
-                
-                # Create File nodes
-                for file_info in code_structure.get("files", []):
-                    await session.run(
-                        """
-                        MATCH (r:Repository {full_name: $repo_full_name})
-                        MERGE (f:File {path: $path, repository: $repo_full_name})
-                        SET f.language = $language,
-                            f.line_count = $line_count,
-                            f.updated_at = datetime()
-                        MERGE (r)-[:CONTAINS]->(f)
-                        """,
-                        repo_full_name=repo_full_name,
-                        path=file_info["path"],
-                        language=file_info.get("language", "unknown"),
-                        line_count=file_info.get("line_count", 0)
-                    )
-                
-                # Create Function nodes
-                for func_info in code_structure.get("functions", []):
-                    await session.run(
-                        """
-                        MATCH (f:File {path: $file_path, repository: $repo_full_name})
-                        MERGE (fn:Function {
-                            name: $name,
-                            file_path: $file_path,
-                            repository: $repo_full_name
-                        })
-                        SET fn.line_start = $line_start,
-                            fn.line_end = $line_end,
-                            fn.is_async = $is_async,
-                            fn.args = $args,
-                            fn.updated_at = datetime()
-                        MERGE (f)-[:DEFINES]->(fn)
-                        """,
-                        repo_full_name=repo_full_name,
-                        file_path=func_info["file_path"],
-                        name=func_info["name"],
-                        line_start=func_info.get("line_start", 0),
-                        line_end=func_info.get("line_end", 0),
-                        is_async=func_info.get("is_async", False),
-                        args=func_info.get("args", [])
-                    )
-                
-                # Create Class nodes
-                for class_info in code_structure.get("classes", []):
-                    await session.run(
+                await result.consume()
+
+                # Files before functions/classes before edges, so MATCHes find their nodes
+                for name, statement in KnowledgeGraphService.CSV_IMPORT_STATEMENTS:
+                    if name not in written:
+                        continue
+                    result = await session.run(
                         """
-                        MATCH (f:File {path: $file_path, repository: $repo_full_name})
-                        MERGE (c:Class {
-                            name: $name,
-                            file_path: $file_path,
-                            repository: $repo_full_name
-                        })
-                        SET c.line_start = $line_start,
-                            c.line_end = $line_end,
-                            c.bases = $bases,
-                            c.methods = $methods,
-                            c.updated_at = datetime()
-                        MERGE (f)-[:DEFINES]->(c)
-                        """,
-                        repo_full_name=repo_full_name,
-                        file_path=class_info["file_path"],
-                        name=class_info["name"],
-                        line_start=class_info.get("line_start", 0),
-                        line_end=class_info.get("line_end", 0),
-                        bases=class_info.get("bases", []),
-                        methods=class_info.get("methods", [])
-                    )
-                    
-                    # Create EXTENDS relationships
-                    for base in class_info.get("bases", []):
-                        await session.run(
-                            """
-                            MATCH (c:Class {name: $class_name, repository: $repo_full_name})
-                            MERGE (bc:Class {name: $base_name, repository: $repo_full_name})
-                            MERGE (c)-[:EXTENDS]->(bc)
-                            """,
-                            repo_full_name=repo_full_name,
-                            class_name=class_info["name"],
-                            base_name=base
-                        )
-                
-                # Create Module/Import nodes
-                for import_info in code_structure.get("imports", []):
-                    module_name = import_info.get("module", "")
-                    if module_name:
-                        await session.run(
-                            """
-                            MATCH (f:File {path: $file_path, repository: $repo_full_name})
-                            MERGE (m:Module {name: $module_name})
-                            MERGE (f)-[:IMPORTS]->(m)
-                            """,
-                            repo_full_name=repo_full_name,
-                            file_path=import_info["file_path"],
-                            module_name=module_name
+                        CALL apoc.periodic.iterate(
+                            'LOAD CSV WITH HEADERS FROM $url AS row RETURN row',
+                            $statement,
+                            {batchSize: $batch_size, parallel: false,
+                             params: {url: $url, repo_full_name: $repo_full_name}}
                         )
-                
-                # Create CALLS relationships (function to function)
-                for call_info in code_structure.get("calls", []):
-                    await session.run(
-                        """
-                        MATCH (f:File {path: $file_path, repository: $repo_full_name})-[:DEFINES]->(caller:Function)
-                        WHERE caller.line_start <= $call_line
-                        WITH caller ORDER BY caller.line_start DESC LIMIT 1
-                        MERGE (called:Function {name: $called_name, repository: $repo_full_name})
-                        MERGE (caller)-[:CALLS]->(called)
+                        YIELD batches, total, errorMessages
+                        RETURN batches, total, errorMessages
                         """,
-                        repo_full_name=repo_full_name,
-                        file_path=call_info["file_path"],
-                        call_line=call_info.get("line", 0),
-                        called_name=call_info["name"]
+                        url=f"file:///{batch_dir}/{name}",
+                        statement=statement,
+                        batch_size=KnowledgeGraphService.CSV_BATCH_SIZE,
+                        repo_full_name=repo_full_name
                     )
-            
-            # Log summary
-            stats = {
-                "files": len(code_structure.get("files", [])),
-                "functions": len(code_structure.get("functions", [])),
-                "classes": len(code_structure.get("classes", [])),
-                "imports": len(code_structure.get("imports", []))
-            }
-            logger.info(f"Indexed codebase for {repo_full_name}: {stats}")
-            
+                    summary = await result.single()
+                    if summary and summary["errorMessages"]:
+                        raise RuntimeError(f"CSV import of {name} failed: {summary['errorMessages']}")
+
+            logger.info(
+                f"CSV-imported codebase for {repo_full_name}: "
+                f"{len(files['paths'])} files, {len(functions)} functions, {len(classes)} classes"
+            )
+
         except Exception as e:
-            logger.error(f"Error indexing codebase: {e}")
+            logger.error(f"Error bulk importing codebase: {e}")
             raise
 
+        finally:
+            shutil.rmtree(local_dir, ignore_errors=True)
+
+    @staticmethod
+    async def index_codebase(
+        repo_full_name: str,
+        code_structure: Dict[str, Any]
+    ):
+        """
+        Index the entire codebase structure in Neo4j.
+        
+        Creates nodes for Files, Functions, Classes, and their relationships.
+        
+        Args:
+            repo_full_name: Full repository name (owner/repo)
+            code_structure: Parsed code structure from CodeParserService
+        """
+        await KnowledgeGraphService.bulk_ingest(repo_full_name, code_structure)
@@ -200,7 +200,12 @@ class PRWorkflowService:
 
                 # 7. Extract and store fix patterns for RAG
                 vulnerabilities = analysis.get('vulnerabilities', [])
-                fixes = analysis.get('fixes', [])
+                results = await db.analysis_results.find_one(
+                    {'analysis_id': analysis_id},
+                    {'fixes': 1}
+                )
+                # Older analyses embedded fixes directly in the analysis document
+                fixes = (results or analysis).get('fixes', [])
 
                 for i, vuln in enumerate(vulnerabilities):
                     if i < len(fixes):
@@ -358,22 +363,27 @@ class PRWorkflowService:
 
             # 5. Update MongoDB with denial
             db = MongoDB.get_database()
+            denial_updates = {
+                'user_approved': False,
+                'denied_by': commenter,
+                'denied_at': datetime.utcnow(),
+                'user_feedback': feedback_text,
+                'feedback_features': feedback_features
+            }
             await db.analyses.update_one(
                 {'id': analysis_id},
                 {
-                    '$set': {
-                        'user_approved': False,
-                        'denied_by': commenter,
-                        'denied_at': datetime.utcnow(),
-                        'user_feedback': feedback_text,
-                        'feedback_features': feedback_features
-                    },
+                    '$set': denial_updates,
                     '$push': {
                         'denial_reasons': feedback_text
                     }
                 }
             )
 
+            # Mirror the write locally so regeneration can use this snapshot without re-reading
+            analysis.update(denial_updates)
+            analysis['denial_reasons'] = analysis.get('denial_reasons', []) + [feedback_text]
+
             logger.info(f"Updated analysis {analysis_id} with denial feedback")
 
             # 6. Submit feedback to RL system
@@ -421,7 +431,8 @@ class PRWorkflowService:
                 'analysis_id': analysis_id,
                 'iteration_number': iteration_number,
                 'feedback_features': feedback_features,
-                'regeneration_queued': True
+                'regeneration_queued': True,
+                'analysis': analysis
             }
 
         except Exception as e:
@@ -0,0 +1,162 @@
+"""Redis-backed locks and completion markers for deduplicating background tasks"""
+
+from typing import Optional
+import asyncio
+import logging
+import time
+
+from app.core.database import RedisDB
+
+logger = logging.getLogger(__name__)
+
+# Delete the lock only if we still own it, so an expired-and-retaken lock isn't dropped
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Counting semaphore on a sorted set scored by expiry time: drop expired holders,
+# then take a slot if fewer than ARGV[2] remain
+_ACQUIRE_SLOT_SCRIPT = """
+redis.call('zremrangebyscore', KEYS[1], '-inf', ARGV[1])
+if redis.call('zcard', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('zadd', KEYS[1], ARGV[3], ARGV[4])
+    redis.call('expire', KEYS[1], ARGV[5])
+    return 1
+end
+return 0
+"""
+
+
+class TaskLockService:
+    """Service for coalescing duplicate per-commit tasks (analysis, graph indexing)"""
+
+    DONE_TTL = 86400  # Remember completed work for 24 hours
+
+    @staticmethod
+    def lock_key(kind: str, repo_full_name: str, commit_sha: str) -> str:
+        """Generate the in-flight lock key for a task kind at a specific commit"""
+        return f"{kind}-lock:{repo_full_name}:{commit_sha}"
+
+    @staticmethod
+    def done_key(kind: str, repo_full_name: str, commit_sha: str) -> str:
+        """Generate the completion marker key for a task kind at a specific commit"""
+        return f"{kind}-done:{repo_full_name}:{commit_sha}"
+
+    @staticmethod
+    async def acquire(key: str, owner: str, ttl: int) -> bool:
+        """
+        Atomically take a lock with SET NX EX.
+
+        Args:
+            key: Lock key
+            owner: Value identifying the holder (used for safe release)
+            ttl: Lock expiry in seconds, so a crashed worker can't hold it forever
+
+        Returns:
+            True if acquired (or Redis is unavailable), False if already held
+        """
+        try:
+            redis = RedisDB.get_client()
+            return bool(await redis.set(key, owner, nx=True, ex=ttl))
+        except Exception as e:
+            logger.warning(f"Lock acquire failed for {key}, proceeding without it: {e}")
+            return True
+
+    @staticmethod
+    async def get_owner(key: str) -> Optional[str]:
+        """Get the current holder of a lock, if any"""
+        try:
+            redis = RedisDB.get_client()
+            return await redis.get(key)
+        except Exception as e:
+            logger.warning(f"Lock lookup failed for {key}: {e}")
+            return None
+
+    @staticmethod
+    async def release(key: str, owner: str) -> None:
+        """Release a lock if it is still held by owner"""
+        try:
+            redis = RedisDB.get_client()
+            await redis.eval(_RELEASE_LOCK_SCRIPT, 1, key, owner)
+        except Exception as e:
+            logger.warning(f"Lock release failed for {key}: {e}")
+
+    @staticmethod
+    async def acquire_slot(
+        key: str,
+        owner: str,
+        limit: int,
+        ttl: int,
+        timeout: float,
+        poll_interval: float = 1.0
+    ) -> None:
+        """
+        Take one of `limit` slots of a Redis-backed counting semaphore, waiting if full.
+
+        Args:
+            key: Semaphore key
+            owner: Value identifying the holder (used for release)
+            limit: Maximum number of concurrent holders
+            ttl: Slot expiry in seconds, so a crashed worker's slot is reclaimed
+            timeout: Seconds to wait for a free slot
+
+        Raises:
+            TimeoutError: If no slot frees up within timeout
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                redis = RedisDB.get_client()
+                now = time.time()
+                acquired = await redis.eval(
+                    _ACQUIRE_SLOT_SCRIPT, 1, key, now, limit, now + ttl, owner, ttl
+                )
+            except Exception as e:
+                logger.warning(f"Semaphore acquire failed for {key}, proceeding without it: {e}")
+                return
+
+            if acquired:
+                return
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"No free slot for {key} after {timeout}s")
+            await asyncio.sleep(poll_interval)
+
+    @staticmethod
+    async def release_slot(key: str, owner: str) -> None:
+        """Give back a semaphore slot taken with acquire_slot"""
+        try:
+            redis = RedisDB.get_client()
+            await redis.zrem(key, owner)
+        except Exception as e:
+            logger.warning(f"Semaphore release failed for {key}: {e}")
+
+    @staticmethod
+    async def get_done(kind: str, repo_full_name: str, commit_sha: str) -> Optional[str]:
+        """Get the result id recorded for completed work at a commit, if any"""
+        try:
+            redis = RedisDB.get_client()
+            return await redis.get(TaskLockService.done_key(kind, repo_full_name, commit_sha))
+        except Exception as e:
+            logger.warning(f"Completion lookup failed: {e}")
+            return None
+
+    @staticmethod
+    async def mark_done(
+        kind: str,
+        repo_full_name: str,
+        commit_sha: str,
+        result_id: str
+    ) -> None:
+        """Record completed work at a commit so duplicates can short-circuit"""
+        try:
+            redis = RedisDB.get_client()
+            await redis.setex(
+                TaskLockService.done_key(kind, repo_full_name, commit_sha),
+                TaskLockService.DONE_TTL,
+                result_id
+            )
+        except Exception as e:
+            logger.warning(f"Failed to record completion: {e}")
@@ -1,17 +1,118 @@
 """User authentication service for GitHub OAuth"""
 
+import asyncio
+import contextlib
+import functools
+import hashlib
 import httpx
-from typing import Optional, Dict, Any, List
+import orjson
+import urllib.parse
+from cachetools import TTLCache
+from pydantic import TypeAdapter
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+from pymongo import ReturnDocument, UpdateOne
+from typing import Callable, Optional, Dict, Any, List, Set, Tuple
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 
 from app.core.database import MongoDB
 from app.core.config import settings
 from app.models.user import User, UserCreate, UserResponse, GitHubInstallation
-from app.utils.encryption import encrypt_token, decrypt_token
+from app.utils.encryption import encrypt_token_v2, decrypt_token
 
 logger = logging.getLogger(__name__)
 
+# Short-lived caches for GitHub responses, keyed by a hash of the access token
+_user_info_cache: TTLCache = TTLCache(maxsize=1024, ttl=60)
+_installations_cache: TTLCache = TTLCache(maxsize=1024, ttl=60)
+_cache_locks: Dict[Tuple[int, Any], asyncio.Lock] = {}
+# Coroutines holding or waiting on each lock, so it is dropped only when unused
+_cache_lock_users: Dict[Tuple[int, Any], int] = {}
+
+# ETag and body of the last 200 response per (token hash, path), for conditional GETs
+_etag_cache: TTLCache = TTLCache(maxsize=4096, ttl=3600)
+
+# Decrypted access tokens keyed by github_id
+_token_cache: TTLCache = TTLCache(maxsize=4096, ttl=300)
+
+_INSTALLATIONS_ADAPTER = TypeAdapter(List[GitHubInstallation])
+
+# Strong references to fire-and-forget tasks so they aren't GC'd mid-flight
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _on_background_task_done(task: asyncio.Task) -> None:
+    """Release a finished background task and log any failure"""
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.error(f"Background task {task.get_name()} failed: {task.exception()}")
+
+
+def _orjson(response: httpx.Response) -> Any:
+    """Decode a JSON response body with orjson"""
+    return orjson.loads(response.content)
+
+
+def _token_cache_key(access_token: str) -> str:
+    """Hash an access token so it is never stored or logged in plain text"""
+    return hashlib.blake2b(access_token.encode(), digest_size=16).hexdigest()
+
+
+@contextlib.asynccontextmanager
+async def _cache_lock(lock_key: Tuple[int, Any]):
+    """Hold the shared lock for ``lock_key``, discarding it once nobody needs it"""
+    lock = _cache_locks.setdefault(lock_key, asyncio.Lock())
+    _cache_lock_users[lock_key] = _cache_lock_users.get(lock_key, 0) + 1
+    try:
+        async with lock:
+            yield
+    finally:
+        _cache_lock_users[lock_key] -= 1
+        if not _cache_lock_users[lock_key]:
+            del _cache_lock_users[lock_key]
+            _cache_locks.pop(lock_key, None)
+
+
+def _cached_by_token(cache: TTLCache):
+    """Memoize an async ``func(access_token, ...)`` in ``cache`` for the cache's TTL"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(access_token: str, *args, **kwargs):
+            key = (_token_cache_key(access_token), args, tuple(sorted(kwargs.items())))
+            if key in cache:
+                return cache[key]
+
+            async with _cache_lock((id(cache), key)):
+                # Another coroutine may have filled the cache while we waited
+                if key in cache:
+                    return cache[key]
+                result = await func(access_token, *args, **kwargs)
+                cache[key] = result
+                return result
+
+        return wrapper
+    return decorator
+
+
+def _is_retryable_github_error(exc: BaseException) -> bool:
+    """Retry rate limiting, server errors and transport failures"""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+async def _run_crypto(func: Callable[[str], str], value: str) -> str:
+    """Run a token encrypt/decrypt call, off the event loop when ENCRYPTION_ASYNC is set"""
+    if settings.ENCRYPTION_ASYNC:
+        return await asyncio.to_thread(func, value)
+    return func(value)
+
+
+def _has_email_scope(token_scope: Optional[str]) -> bool:
+    """Check whether granted OAuth scopes allow reading /user/emails"""
+    scopes = {scope.strip() for scope in (token_scope or "").split(",")}
+    return "user:email" in scopes or "user" in scopes
+
 
 class UserAuthService:
     """Service for GitHub OAuth user authentication"""
@@ -21,6 +122,13 @@ class UserAuthService:
     OAUTH_TOKEN_URL = "https://github.com/login/oauth/access_token"
     GITHUB_API_BASE = "https://api.github.com"
 
+    # Static part of the authorization URL, encoded once at import
+    _AUTHORIZE_BASE_URL = f"{OAUTH_AUTHORIZE_URL}?" + urllib.parse.urlencode({
+        "client_id": settings.GITHUB_CLIENT_ID,
+        "redirect_uri": settings.GITHUB_OAUTH_CALLBACK_URL,
+        "scope": "user:email read:org",  # Scopes needed for user info and installations
+    })
+
     @staticmethod
     def get_authorization_url(state: Optional[str] = None) -> str:
         """
@@ -32,17 +140,55 @@ class UserAuthService:
         Returns:
             str: Authorization URL to redirect users to
         """
-        params = {
-            "client_id": settings.GITHUB_CLIENT_ID,
-            "redirect_uri": settings.GITHUB_OAUTH_CALLBACK_URL,
-            "scope": "user:email read:org",  # Scopes needed for user info and installations
+        base_url = UserAuthService._AUTHORIZE_BASE_URL
+        if not state:
+            return base_url
+        return f"{base_url}&state={urllib.parse.quote(state, safe='')}"
+
+    @staticmethod
+    @retry(
+        retry=retry_if_exception(_is_retryable_github_error),
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, max=10),
+        reraise=True,
+    )
+    async def _github_get(
+        client: httpx.AsyncClient,
+        path: str,
+        access_token: str
+    ) -> Tuple[int, httpx.Headers, Any]:
+        """
+        GET a GitHub API path, revalidating with a cached ETag when available
+
+        A 304 response doesn't count against the rate limit and returns the
+        cached body.
+
+        Returns:
+            Tuple of (status code, response headers, decoded body)
+        """
+        cache_key = (_token_cache_key(access_token), path)
+        cached = _etag_cache.get(cache_key)
+
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Accept": "application/vnd.github+json",
         }
+        if cached:
+            headers["If-None-Match"] = cached[0]
 
-        if state:
-            params["state"] = state
+        response = await client.get(f"{UserAuthService.GITHUB_API_BASE}{path}", headers=headers)
 
-        query_string = "&".join(f"{k}={v}" for k, v in params.items())
-        return f"{UserAuthService.OAUTH_AUTHORIZE_URL}?{query_string}"
+        if response.status_code == 304 and cached:
+            return response.status_code, response.headers, cached[1]
+
+        response.raise_for_status()
+        body = _orjson(response)
+
+        etag = response.headers.get("ETag")
+        if etag:
+            _etag_cache[cache_key] = (etag, body)
+
+        return response.status_code, response.headers, body
 
     @staticmethod
     async def exchange_code_for_token(code: str) -> Dict[str, Any]:
@@ -74,7 +220,7 @@ class UserAuthService:
                 )
 
                 response.raise_for_status()
-                token_data = response.json()
+                token_data = _orjson(response)
 
                 if "error" in token_data:
                     raise Exception(f"OAuth error: {token_data.get('error_description', token_data['error'])}")
@@ -86,47 +232,44 @@ class UserAuthService:
             raise
 
     @staticmethod
-    async def get_user_info(access_token: str) -> Dict[str, Any]:
+    @_cached_by_token(_user_info_cache)
+    async def get_user_info(access_token: str, include_emails: bool = True) -> Dict[str, Any]:
         """
         Get user information from GitHub API
 
         Args:
             access_token: GitHub OAuth access token
+            include_emails: Also query /user/emails for a private primary email
 
         Returns:
             Dict containing user information (id, login, email, name, avatar_url, etc.)
         """
         try:
             async with httpx.AsyncClient() as client:
-                # Get user info
-                response = await client.get(
-                    f"{UserAuthService.GITHUB_API_BASE}/user",
-                    headers={
-                        "Authorization": f"Bearer {access_token}",
-                        "Accept": "application/vnd.github+json",
-                    },
-                )
-
-                response.raise_for_status()
-                user_data = response.json()
-
-                # Get user emails if not public
-                if not user_data.get("email"):
-                    email_response = await client.get(
-                        f"{UserAuthService.GITHUB_API_BASE}/user/emails",
-                        headers={
-                            "Authorization": f"Bearer {access_token}",
-                            "Accept": "application/vnd.github+json",
-                        },
+                user_request = UserAuthService._github_get(client, "/user", access_token)
+
+                if include_emails:
+                    # Request user info and emails concurrently; the emails response
+                    # is only used when the profile email is private
+                    user_result, email_result = await asyncio.gather(
+                        user_request,
+                        UserAuthService._github_get(client, "/user/emails", access_token),
+                        return_exceptions=True,
+                    )
+                    if isinstance(user_result, Exception):
+                        raise user_result
+                else:
+                    user_result, email_result = await user_request, None
+
+                # Copy so the ETag-cached body is never mutated
+                user_data = dict(user_result[2])
+
+                # Use the primary verified email if the profile email is not public
+                if not user_data.get("email") and isinstance(email_result, tuple):
+                    user_data["email"] = next(
+                        (e["email"] for e in email_result[2] if e.get("primary") and e.get("verified")),
+                        None
                     )
-
-                    if email_response.status_code == 200:
-                        emails = email_response.json()
-                        # Find primary verified email
-                        for email in emails:
-                            if email.get("primary") and email.get("verified"):
-                                user_data["email"] = email["email"]
-                                break
 
                 return user_data
 
@@ -135,6 +278,7 @@ class UserAuthService:
             raise
 
     @staticmethod
+    @_cached_by_token(_installations_cache)
     async def get_user_installations(access_token: str) -> List[Dict[str, Any]]:
         """
         Get GitHub App installations accessible by the user
@@ -147,16 +291,9 @@ class UserAuthService:
         """
         try:
             async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{UserAuthService.GITHUB_API_BASE}/user/installations",
-                    headers={
-                        "Authorization": f"Bearer {access_token}",
-                        "Accept": "application/vnd.github+json",
-                    },
+                _, _, data = await UserAuthService._github_get(
+                    client, "/user/installations", access_token
                 )
-
-                response.raise_for_status()
-                data = response.json()
                 return data.get("installations", [])
 
         except Exception as e:
@@ -179,94 +316,121 @@ class UserAuthService:
             db = MongoDB.get_database()
 
             # Encrypt the access token
-            encrypted_token = encrypt_token(user_create.access_token)
-
-            # Check if user exists
-            existing_user = await db.users.find_one({"github_id": user_create.github_id})
-
-            if existing_user:
-                # Update existing user
-                update_data = {
-                    "github_login": user_create.github_login,
-                    "email": user_create.email,
-                    "name": user_create.name,
-                    "avatar_url": user_create.avatar_url,
-                    "access_token_encrypted": encrypted_token,
-                    "token_type": user_create.token_type,
-                    "token_scope": user_create.token_scope,
-                    "updated_at": datetime.utcnow(),
-                    "last_login": datetime.utcnow(),
-                }
-
-                await db.users.update_one(
-                    {"github_id": user_create.github_id},
-                    {"$set": update_data}
-                )
-
-                logger.info(f"Updated user {user_create.github_login} (ID: {user_create.github_id})")
-
-                # Fetch updated user
-                updated_user = await db.users.find_one({"github_id": user_create.github_id})
-                return User(**updated_user)
-
-            else:
-                # Create new user
-                user = User(
-                    github_id=user_create.github_id,
-                    github_login=user_create.github_login,
-                    email=user_create.email,
-                    name=user_create.name,
-                    avatar_url=user_create.avatar_url,
-                    access_token_encrypted=encrypted_token,
-                    token_type=user_create.token_type,
-                    token_scope=user_create.token_scope,
-                    installations=[],
-                    created_at=datetime.utcnow(),
-                    updated_at=datetime.utcnow(),
-                    last_login=datetime.utcnow(),
-                )
+            encrypted_token = await _run_crypto(encrypt_token_v2, user_create.access_token)
+
+            now = datetime.now(timezone.utc)
+            set_fields = {
+                "github_login": user_create.github_login,
+                "email": user_create.email,
+                "name": user_create.name,
+                "avatar_url": user_create.avatar_url,
+                "access_token_encrypted": encrypted_token,
+                "token_type": user_create.token_type,
+                "token_scope": user_create.token_scope,
+                "updated_at": now,
+                "last_login": now,
+            }
+            insert_fields = {
+                "github_id": user_create.github_id,
+                "installations": [],
+                "created_at": now,
+            }
+
+            # Atomically update the user, inserting them on first login
+            updated_user = await db.users.find_one_and_update(
+                {"github_id": user_create.github_id},
+                {"$set": set_fields, "$setOnInsert": insert_fields},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
 
-                await db.users.insert_one(user.model_dump(mode='json'))
+            UserAuthService.invalidate_access_token(user_create.github_id)
 
-                logger.info(f"Created new user {user_create.github_login} (ID: {user_create.github_id})")
+            logger.info(f"Upserted user {user_create.github_login} (ID: {user_create.github_id})")
 
-                return user
+            return User(**updated_user)
 
         except Exception as e:
             logger.error(f"Error creating/updating user: {e}", exc_info=True)
             raise
 
     @staticmethod
-    async def sync_user_installations(github_id: int, access_token: str) -> None:
+    def invalidate(access_token: str) -> None:
         """
-        Sync user's GitHub App installations to database
+        Drop cached GitHub responses for an access token
+
+        Args:
+            access_token: GitHub OAuth access token
+        """
+        token_key = _token_cache_key(access_token)
+        for cache in (_user_info_cache, _installations_cache):
+            for key in [key for key in list(cache.keys()) if key[0] == token_key]:
+                cache.pop(key, None)
+
+    @staticmethod
+    async def _persist_installations(
+        github_id: int,
+        installations_data: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Write already-fetched GitHub App installations to the user's document
 
         Args:
             github_id: GitHub user ID
-            access_token: User's OAuth access token (plain text)
+            installations_data: Installation payloads from the GitHub API
         """
         try:
-            installations_data = await UserAuthService.get_user_installations(access_token)
-
-            installations = []
-            for install_data in installations_data:
-                installation = GitHubInstallation(
-                    installation_id=install_data["id"],
-                    account_login=install_data["account"]["login"],
-                    account_type=install_data["account"]["type"],
-                    repositories=[],  # Could be populated from install_data if needed
-                    created_at=datetime.utcnow()
-                )
-                installations.append(installation.model_dump(mode='json'))
-
-            # Update user's installations in database
+            now = datetime.now(timezone.utc)
             db = MongoDB.get_database()
-            await db.users.update_one(
+
+            # Diff against the stored installation IDs so only changes hit the wire
+            current = await db.users.find_one(
                 {"github_id": github_id},
-                {"$set": {"installations": installations, "updated_at": datetime.utcnow()}}
+                {"installations.installation_id": 1}
+            )
+            current_ids = {
+                inst["installation_id"]
+                for inst in (current or {}).get("installations", [])
+            }
+            fetched = {install_data["id"]: install_data for install_data in installations_data}
+
+            to_remove = list(current_ids - fetched.keys())
+            new_installations: List[GitHubInstallation] = [
+                GitHubInstallation(
+                    installation_id=installation_id,
+                    account_login=fetched[installation_id]["account"]["login"],
+                    account_type=fetched[installation_id]["account"]["type"],
+                    repositories=[],  # Could be populated from install_data if needed
+                    created_at=now
+                )
+                for installation_id in fetched.keys() - current_ids
+            ]
+            to_add = _INSTALLATIONS_ADAPTER.dump_python(new_installations)
+
+            if not to_remove and not to_add:
+                logger.info(f"Installations for user {github_id} are up to date")
+                return
+
+            # $pull and $addToSet can't target the same array in one update,
+            # so send them as ordered operations in a single bulk write
+            operations = []
+            if to_remove:
+                operations.append(UpdateOne(
+                    {"github_id": github_id},
+                    {"$pull": {"installations": {"installation_id": {"$in": to_remove}}}}
+                ))
+
+            update = {"$set": {"updated_at": now}}
+            if to_add:
+                update["$addToSet"] = {"installations": {"$each": to_add}}
+            operations.append(UpdateOne({"github_id": github_id}, update))
+
+            await db.users.bulk_write(operations, ordered=True)
+
+            logger.info(
+                f"Synced installations for user {github_id}: "
+                f"{len(to_add)} added, {len(to_remove)} removed"
             )
-
-            logger.info(f"Synced {len(installations)} installations for user {github_id}")
 
         except Exception as e:
             logger.error(f"Error syncing installations: {e}", exc_info=True)
@@ -285,7 +449,7 @@ class UserAuthService:
         """
         try:
             db = MongoDB.get_database()
-            user_data = await db.users.find_one({"github_id": github_id})
+            user_data = await db.users.find_one({"github_id": github_id}, {"_id": 0})
 
             if user_data:
                 return User(**user_data)
@@ -307,15 +471,43 @@ class UserAuthService:
             Decrypted access token or None if user not found
         """
         try:
-            user = await UserAuthService.get_user_by_github_id(github_id)
-            if user:
-                return decrypt_token(user.access_token_encrypted)
-            return None
+            if github_id in _token_cache:
+                return _token_cache[github_id]
+
+            async with _cache_lock((id(_token_cache), github_id)):
+                if github_id in _token_cache:
+                    return _token_cache[github_id]
+
+                db = MongoDB.get_database()
+                user_data = await db.users.find_one(
+                    {"github_id": github_id},
+                    {"_id": 0, "access_token_encrypted": 1}
+                )
+                if not user_data:
+                    return None
+
+                access_token = await _run_crypto(decrypt_token, user_data["access_token_encrypted"])
+                _token_cache[github_id] = access_token
+                return access_token
 
         except Exception as e:
             logger.error(f"Error getting user access token: {e}")
             raise
 
+    @staticmethod
+    def invalidate_access_token(github_id: int) -> None:
+        """
+        Drop a user's cached decrypted access token.
+
+        Called on re-login, when the stored token is replaced. There is no
+        logout endpoint yet; one should call this too. Until then, a revoked
+        token stays cached for at most the cache TTL (5 minutes).
+
+        Args:
+            github_id: GitHub user ID
+        """
+        _token_cache.pop(github_id, None)
+
     @staticmethod
     async def handle_oauth_callback(code: str, state: Optional[str] = None) -> UserResponse:
         """
@@ -338,8 +530,20 @@ class UserAuthService:
             token_type = token_data.get("token_type", "bearer")
             token_scope = token_data.get("scope", "")
 
-            # Get user information
-            user_info = await UserAuthService.get_user_info(access_token)
+            # Get user information and installations concurrently (both only need the token)
+            user_info, installations_data = await asyncio.gather(
+                UserAuthService.get_user_info(
+                    access_token,
+                    include_emails=_has_email_scope(token_scope)
+                ),
+                UserAuthService.get_user_installations(access_token),
+                return_exceptions=True,
+            )
+
+            if isinstance(user_info, Exception):
+                raise user_info
+            if isinstance(installations_data, Exception):
+                installations_data = []
 
             # Create user data
             user_create = UserCreate(
@@ -356,20 +560,18 @@ class UserAuthService:
             # Create or update user in database
             user = await UserAuthService.create_or_update_user(user_create)
 
-            # Sync installations in background (don't wait)
-            await UserAuthService.sync_user_installations(user.github_id, access_token)
-
-            # Return public user data
-            return UserResponse(
-                github_id=user.github_id,
-                github_login=user.github_login,
-                email=user.email,
-                name=user.name,
-                avatar_url=user.avatar_url,
-                installations=user.installations,
-                created_at=user.created_at,
-                last_login=user.last_login,
-            )
+            # Persist installations in the background (don't wait), then drop
+            # the cached GitHub responses so the next lookup sees the new state
+            async def persist_installations() -> None:
+                await UserAuthService._persist_installations(user.github_id, installations_data)
+                UserAuthService.invalidate(access_token)
+
+            task = asyncio.create_task(persist_installations())
+            _background_tasks.add(task)
+            task.add_done_callback(_on_background_task_done)
+
+            # Return public user data straight from the upsert result
+            return UserResponse.model_validate(user, from_attributes=True)
 
         except Exception as e:
             logger.error(f"Error handling OAuth callback: {e}", exc_info=True)
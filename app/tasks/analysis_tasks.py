@@ -3,9 +3,14 @@
 from typing import Optional
 import asyncio
 import logging
-from datetime import datetime
-
-from app.tasks.celery_app import celery_app
+from datetime import datetime, timezone
+from pymongo import WriteConcern
+
+from app.tasks.celery_app import (
+    celery_app,
+    get_worker_loop,
+    get_worker_service,
+)
 from app.services.github_service import GitHubService
 from app.services.compression_service import CompressionService
 from app.services.agents.orchestrator import AgentOrchestrator
@@ -13,12 +18,27 @@ from app.services.fix_service import FixService
 from app.services.cache_service import RepositoryCacheService
 from app.services.knowledge_graph_service import KnowledgeGraphService
 from app.services.code_parser_service import CodeParserService
-from app.core.database import MongoDB, connect_databases, disconnect_databases
+from app.services.task_lock_service import TaskLockService
+from app.tasks.graph_tasks import write_summary_node_task
+from app.core.database import MongoDB
 from app.models.analysis import AnalysisStatus
 
 logger = logging.getLogger(__name__)
 
+# The IN_PROGRESS transition must be acknowledged: an unacknowledged write could land
+# after a fast FAILED/COMPLETED and leave the analysis stuck in progress. It skips the
+# journal wait, though; COMPLETED/FAILED keep the collection's default durability
+PROGRESS_WRITE_CONCERN = WriteConcern(w=1, j=False)
+
+# In-flight locks outlive the task time limit so a crashed worker's lock still expires
+ANALYSIS_LOCK_TTL = 1800
+INDEX_LOCK_TTL = 1800
+
+# Debate transcript entries worth keeping as summary highlights in the graph
+HIGHLIGHT_ACTIONS = frozenset({'analysis_complete', 'aggregation_complete'})
 
+
+# Acked early: a rerun would repeat the LLM calls, the summary comment and the fix PR
 @celery_app.task(bind=True, name='run_security_analysis')
 def run_security_analysis(
     self,
@@ -42,20 +62,12 @@ def run_security_analysis(
     If user_settings is provided, the user's custom LLM API key
     and provider preference will be used for the analysis.
     """
-    logger.info(f"Starting analysis task for {analysis_id}")
+    logger.info("Starting analysis task for %s", analysis_id)
     if user_settings:
-        logger.info(f"Using custom LLM settings: provider={user_settings.get('llm_provider')}")
+        logger.debug("Using custom LLM settings: provider=%s", user_settings.get('llm_provider'))
 
-    # Run async code in event loop - create new loop if needed
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_closed():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    
+    # Run on the worker's persistent loop so database pools are reused
+    loop = get_worker_loop()
     return loop.run_until_complete(
         _run_analysis_async(
             analysis_id,
@@ -77,30 +89,52 @@ async def _run_analysis_async(
     user_settings: Optional[dict] = None
 ):
     """Async implementation of analysis task"""
-    github_service = GitHubService()
-    compression_service = CompressionService()
+    github_service = get_worker_service(GitHubService)
+    compression_service = get_worker_service(CompressionService)
     orchestrator = AgentOrchestrator(user_settings=user_settings)
-    fix_service = FixService()
+    fix_service = get_worker_service(FixService)
 
     repo_path = None
+    dedup_ref = _dedup_ref(commit_sha, pr_number)
+    lock_key = TaskLockService.lock_key("analyze", repo_full_name, dedup_ref)
 
     try:
-        # Connect to databases
-        await connect_databases()
+        # Coalesce duplicate runs for the same commit (e.g. PR synchronize + push)
+        duplicate_of = await _claim_analysis(analysis_id, repo_full_name, dedup_ref, lock_key)
+        if duplicate_of:
+            logger.info("Analysis %s duplicates %s, skipping", analysis_id, duplicate_of)
+            await _update_analysis_status(
+                analysis_id,
+                AnalysisStatus.COMPLETED,
+                {
+                    'completed_at': datetime.now(timezone.utc),
+                    'duplicate_of': duplicate_of,
+                    'summary': f'Duplicate of analysis {duplicate_of} for the same commit.'
+                }
+            )
+            return {
+                'analysis_id': duplicate_of,
+                'status': 'duplicate'
+            }
 
         # Update status to in_progress
-        await _update_analysis_status(analysis_id, AnalysisStatus.IN_PROGRESS)
+        await _update_analysis_status(
+            analysis_id,
+            AnalysisStatus.IN_PROGRESS,
+            write_concern=PROGRESS_WRITE_CONCERN,
+            heartbeat=True
+        )
 
         # Step 1: Check cache for existing code files
-        logger.info(f"Step 1: Checking cache for {repo_full_name}@{commit_sha[:7]}")
+        logger.debug("Step 1: Checking cache for %s@%s", repo_full_name, commit_sha[:7])
         code_files = await RepositoryCacheService.get_cached_code(repo_full_name, commit_sha)
         
         if code_files:
-            logger.info(f"Cache hit! Using {len(code_files)} cached files")
+            logger.debug("Cache hit! Using %s cached files", len(code_files))
             repo_path = None  # No cleanup needed
         else:
             # Clone repository
-            logger.info(f"Cache miss. Cloning repository {repo_full_name}@{commit_sha}")
+            logger.debug("Cache miss. Cloning repository %s@%s", repo_full_name, commit_sha)
             repo_path = await github_service.clone_repository(
                 repo_full_name=repo_full_name,
                 commit_sha=commit_sha,
@@ -108,7 +142,7 @@ async def _run_analysis_async(
             )
 
             # Step 2: Extract code files
-            logger.info("Step 2: Extracting code files")
+            logger.debug("Step 2: Extracting code files")
             code_files = await github_service.get_code_files(repo_path)
             
             # Cache for future use
@@ -121,7 +155,7 @@ async def _run_analysis_async(
                 analysis_id,
                 AnalysisStatus.COMPLETED,
                 {
-                    'completed_at': datetime.utcnow(),
+                    'completed_at': datetime.now(timezone.utc),
                     'vulnerabilities': [],
                     'dependency_risks': [],
                     'summary': 'No code files found in repository.'
@@ -129,35 +163,18 @@ async def _run_analysis_async(
             )
             return
 
-        # Step 3: Parse and index codebase structure (skip if already indexed)
-        logger.info("Step 3: Checking if codebase needs indexing")
-        try:
-            from app.core.database import RedisDB
-            redis = RedisDB.get_client()
-            index_key = f"indexed:{repo_full_name}:{commit_sha}"
-            already_indexed = await redis.get(index_key)
-            
-            if already_indexed:
-                logger.info("Step 3: Codebase already indexed for this commit, skipping")
-            else:
-                logger.info("Step 3: Parsing codebase structure")
-                code_structure = await CodeParserService.parse_files(code_files)
-                await KnowledgeGraphService.index_codebase(repo_full_name, code_structure)
-                # Mark as indexed (TTL: 7 days)
-                await redis.setex(index_key, 604800, "1")
-                logger.info("Step 3: Indexed codebase in Neo4j")
-        except Exception as e:
-            logger.warning(f"Failed to index codebase: {e}")
-
-        # Step 4: Compress code
-        logger.info("Step 4: Compressing code")
-        compression_result = await compression_service.compress_code(
-            code_files=code_files,
-            target_tokens=100000
+        # Steps 3-4: Index the codebase and compress code concurrently; both only
+        # read code_files. Compression starts first so its API call is in flight
+        # while parsing runs.
+        logger.debug("Step 4: Compressing code")
+        compress_task = asyncio.create_task(
+            _compress_with_cache(compression_service, repo_full_name, commit_sha, code_files)
         )
+        await _index_codebase(analysis_id, repo_full_name, commit_sha, code_files)
+        compression_result = await compress_task
 
         # Step 4: Run multi-agent analysis
-        logger.info("Step 4: Running multi-agent security analysis")
+        logger.debug("Step 4: Running multi-agent security analysis")
         analysis_result = await orchestrator.analyze(
             code=compression_result['compressed_code'],
             context={
@@ -168,92 +185,119 @@ async def _run_analysis_async(
             }
         )
 
-        # Step 5: Post analysis summary to PR or commit
+        # Step 5: Post analysis summary to PR or commit while fixes are generated
         summary_comment = fix_service.generate_summary(
             analysis_result['vulnerabilities'],
             analysis_result['dependency_risks']
         )
         
         if pr_number:
-            logger.info(f"Step 5: Posting analysis results to PR #{pr_number}")
-            await github_service.add_pr_comment(
-                repo_full_name=repo_full_name,
-                pr_number=pr_number,
-                comment=summary_comment
+            logger.debug("Step 5: Posting analysis results to PR #%s", pr_number)
+            summary_post = asyncio.create_task(
+                github_service.add_pr_comment(
+                    repo_full_name=repo_full_name,
+                    pr_number=pr_number,
+                    comment=summary_comment
+                )
             )
         else:
-            logger.info(f"Step 5: Posting analysis results to commit {commit_sha[:7]}")
-            await github_service.add_commit_comment(
-                repo_full_name=repo_full_name,
-                commit_sha=commit_sha,
-                comment=summary_comment
+            logger.debug("Step 5: Posting analysis results to commit %s", commit_sha[:7])
+            summary_post = asyncio.create_task(
+                github_service.add_commit_comment(
+                    repo_full_name=repo_full_name,
+                    commit_sha=commit_sha,
+                    comment=summary_comment
+                )
             )
 
         # Step 6: Generate fixes if vulnerabilities found
         pr_info = None
         fixes = []  # Initialize fixes list
-        if analysis_result['vulnerabilities']:
-            logger.info(f"Step 6: Generating fixes for {len(analysis_result['vulnerabilities'])} vulnerabilities")
-
-            fixes = await fix_service.generate_fixes(
-                vulnerabilities=analysis_result['vulnerabilities'],
-                code_files=code_files,
-                repo_path=repo_path
-            )
+        try:
+            if analysis_result['vulnerabilities']:
+                logger.debug("Step 6: Generating fixes for %s vulnerabilities", len(analysis_result['vulnerabilities']))
 
-            if fixes:
-                # Create PR with fixes
-                logger.info("Step 7: Creating pull request with fixes")
-                pr_info = await github_service.create_fix_pr(
-                    repo_full_name=repo_full_name,
-                    base_commit=commit_sha,
-                    fixes=fixes,
-                    analysis_summary=summary_comment,
-                    source_pr_number=pr_number
+                fixes = await fix_service.generate_fixes(
+                    vulnerabilities=analysis_result['vulnerabilities'],
+                    code_files=code_files,
+                    repo_path=repo_path
                 )
-        else:
-            logger.info("No vulnerabilities found, skipping fix generation")
+
+                if fixes:
+                    # Create PR with fixes
+                    logger.debug("Step 7: Creating pull request with fixes")
+                    pr_info = await github_service.create_fix_pr(
+                        repo_full_name=repo_full_name,
+                        base_commit=commit_sha,
+                        fixes=fixes,
+                        analysis_summary=summary_comment,
+                        source_pr_number=pr_number
+                    )
+            else:
+                logger.debug("No vulnerabilities found, skipping fix generation")
+        finally:
+            # The summary comment is best-effort: by now a fix PR may already exist,
+            # and failing the analysis would leave it unrecorded
+            (comment_error,) = await asyncio.gather(summary_post, return_exceptions=True)
+            if isinstance(comment_error, Exception):
+                logger.warning("Failed to post analysis summary for %s: %s", analysis_id, comment_error)
 
         # Step 8: Update analysis with results
-        logger.info("Step 8: Saving analysis results")
-        
-        await _update_analysis_status(
-            analysis_id,
-            AnalysisStatus.COMPLETED,
-            {
-                'vulnerabilities': analysis_result['vulnerabilities'],
-                'dependency_risks': analysis_result['dependency_risks'],
-                'agent_analyses': analysis_result['agent_analyses'],
-                'debate_transcript': analysis_result.get('debate_transcript', []),
-                'summary': analysis_result.get('summary', ''),
-                'completed_at': datetime.utcnow(),
-                'total_execution_time': analysis_result['total_execution_time'],
-                'total_tokens_used': analysis_result['total_tokens_used'],
-                'pr_number': pr_info['pr_number'] if pr_info else None,
-                'pr_url': pr_info['pr_url'] if pr_info else None,
-                'code_files': code_files,  # Store for regeneration
-                'fixes': fixes  # Store fixes for regeneration
-            }
+        logger.debug("Step 8: Saving analysis results")
+
+        # Source files and fixes are only needed for regeneration/approval, so they
+        # live in analysis_results and don't weigh down every analysis read
+        db = MongoDB.get_database()
+        await asyncio.gather(
+            _update_analysis_status(
+                analysis_id,
+                AnalysisStatus.COMPLETED,
+                {
+                    'vulnerabilities': analysis_result['vulnerabilities'],
+                    'dependency_risks': analysis_result['dependency_risks'],
+                    'agent_analyses': analysis_result['agent_analyses'],
+                    'debate_transcript': analysis_result.get('debate_transcript', []),
+                    'summary': analysis_result.get('summary', ''),
+                    'completed_at': datetime.now(timezone.utc),
+                    'total_execution_time': analysis_result['total_execution_time'],
+                    'total_tokens_used': analysis_result['total_tokens_used'],
+                    'pr_number': pr_info['pr_number'] if pr_info else None,
+                    'pr_url': pr_info['pr_url'] if pr_info else None
+                }
+            ),
+            db.analysis_results.replace_one(
+                {'analysis_id': analysis_id},
+                {
+                    'analysis_id': analysis_id,
+                    'code_files': code_files,  # Store for regeneration
+                    'fixes': fixes  # Store fixes for regeneration
+                },
+                upsert=True
+            )
         )
 
+        await TaskLockService.mark_done("analysis", repo_full_name, dedup_ref, analysis_id)
+
         # Step 9: Save summary to Neo4j knowledge graph
         try:
+            # A list, not a generator: it is shipped as a Celery task argument
             debate_highlights = [
-                entry.get('reasoning', entry.get('summary', ''))
-                for entry in analysis_result.get('debate_transcript', [])
-                if entry.get('action') in ('analysis_complete', 'aggregation_complete')
+                entry.get('reasoning') or entry.get('summary', '')
+                for entry in analysis_result.get('debate_transcript', ())
+                if entry.get('action') in HIGHLIGHT_ACTIONS
             ]
-            await KnowledgeGraphService.create_analysis_summary_node(
+            # Off the critical path: the graph worker writes it after we return
+            write_summary_node_task.delay(
                 analysis_id=analysis_id,
                 repo_full_name=repo_full_name,
                 summary=analysis_result.get('summary', ''),
                 debate_highlights=debate_highlights
             )
-            logger.info("Step 9: Saved analysis summary to Neo4j")
+            logger.debug("Step 9: Queued analysis summary for Neo4j")
         except Exception as e:
-            logger.warning(f"Failed to save summary to Neo4j: {e}")
+            logger.warning("Failed to queue summary for Neo4j: %s", e)
 
-        logger.info(f"Analysis {analysis_id} completed successfully")
+        logger.info("Analysis %s completed successfully", analysis_id)
 
         return {
             'analysis_id': analysis_id,
@@ -264,14 +308,14 @@ async def _run_analysis_async(
         }
 
     except Exception as e:
-        logger.error(f"Analysis {analysis_id} failed: {e}", exc_info=True)
+        logger.error("Analysis %s failed: %s", analysis_id, e, exc_info=True)
 
         # Update status to failed
         await _update_analysis_status(
             analysis_id,
             AnalysisStatus.FAILED,
             {
-                'completed_at': datetime.utcnow(),
+                'completed_at': datetime.now(timezone.utc),
                 'error': str(e)
             }
         )
@@ -280,28 +324,140 @@ async def _run_analysis_async(
 
     finally:
         # Cleanup
+        await TaskLockService.release(lock_key, analysis_id)
         if repo_path:
             github_service.cleanup_repo(repo_path)
 
-        # Disconnect from databases
-        await disconnect_databases()
+
+async def _compress_with_cache(
+    compression_service: CompressionService,
+    repo_full_name: str,
+    commit_sha: str,
+    code_files: list,
+    target_tokens: int = 100000
+) -> dict:
+    """Step 4: Compress code, reusing a cached result for the same commit and file set"""
+    # Small codebases already fit the budget; skip the API call and the cache
+    if not compression_service.should_compress(code_files, target_tokens):
+        logger.debug("Step 4: Codebase under token budget, skipping compression")
+        return compression_service.uncompressed_result(code_files)
+
+    # Hashing every file is CPU-bound; do it once, off the loop, for both lookups
+    fingerprint = await asyncio.to_thread(RepositoryCacheService.fingerprint_code_files, code_files)
+    compression_result = await RepositoryCacheService.get_cached_compression(
+        repo_full_name, commit_sha, target_tokens, fingerprint
+    )
+    if compression_result:
+        return compression_result
+
+    compression_result = await compression_service.compress_code(
+        code_files=code_files,
+        target_tokens=target_tokens
+    )
+    # Don't pin a degraded fallback result for a week
+    if not compression_result.get('fallback'):
+        await RepositoryCacheService.cache_compression(
+            repo_full_name, commit_sha, target_tokens, fingerprint, compression_result
+        )
+    return compression_result
+
+
+async def _index_codebase(
+    analysis_id: str,
+    repo_full_name: str,
+    commit_sha: str,
+    code_files: list
+):
+    """Step 3: Parse and index codebase structure (skip if already indexed); never raises"""
+    logger.debug("Step 3: Checking if codebase needs indexing")
+    index_lock_key = TaskLockService.lock_key("index", repo_full_name, commit_sha)
+    try:
+        from app.core.database import RedisDB
+        redis = RedisDB.get_client()
+        index_key = f"indexed:{repo_full_name}:{commit_sha}"
+        already_indexed = await redis.get(index_key)
+        
+        if already_indexed:
+            logger.debug("Step 3: Codebase already indexed for this commit, skipping")
+        elif not await TaskLockService.acquire(index_lock_key, analysis_id, INDEX_LOCK_TTL):
+            logger.debug("Step 3: Codebase is being indexed by another task, skipping")
+        else:
+            logger.debug("Step 3: Parsing codebase structure")
+            code_structure = await CodeParserService.parse_files(code_files)
+            await KnowledgeGraphService.index_codebase(repo_full_name, code_structure)
+            # Mark as indexed (TTL: 7 days)
+            await redis.setex(index_key, 604800, "1")
+            logger.debug("Step 3: Indexed codebase in Neo4j")
+    except Exception as e:
+        logger.warning("Failed to index codebase: %s", e)
+    finally:
+        await TaskLockService.release(index_lock_key, analysis_id)
+
+
+def _dedup_ref(commit_sha: str, pr_number: Optional[int]) -> str:
+    """
+    Scope analysis deduplication to a commit and, for PR analyses, the PR
+
+    A PR analysis must not reuse a push analysis of the same commit: it owes
+    the PR its own summary comment and fix PR.
+    """
+    return f"{commit_sha}:pr{pr_number}" if pr_number else commit_sha
+
+
+async def _claim_analysis(
+    analysis_id: str,
+    repo_full_name: str,
+    dedup_ref: str,
+    lock_key: str
+) -> Optional[str]:
+    """
+    Take the per-commit analysis lock, or find the analysis this one duplicates
+
+    Args:
+        dedup_ref: Commit (and PR) the analysis covers, from _dedup_ref
+
+    Returns:
+        ID of the completed or in-flight analysis for the same commit and PR,
+        or None if this analysis should run
+    """
+    done_id = await TaskLockService.get_done("analysis", repo_full_name, dedup_ref)
+    if done_id and done_id != analysis_id:
+        return done_id
+
+    if await TaskLockService.acquire(lock_key, analysis_id, ANALYSIS_LOCK_TTL):
+        return None
+
+    owner = await TaskLockService.get_owner(lock_key)
+    return owner if owner and owner != analysis_id else None
 
 
 async def _update_analysis_status(
     analysis_id: str,
     status: AnalysisStatus,
-    updates: dict = None
+    updates: dict = None,
+    write_concern: Optional[WriteConcern] = None,
+    heartbeat: bool = False
 ):
-    """Update analysis status in database"""
+    """
+    Update analysis status in database (default durability unless write_concern is given)
+
+    With heartbeat=True the server stamps `heartbeat` via $currentDate, so
+    progress writes carry a liveness timestamp without a client clock read.
+    """
     db = MongoDB.get_database()
+    collection = db.analyses
+    if write_concern is not None:
+        collection = collection.with_options(write_concern=write_concern)
+
     update_data = {'status': status}
 
     if updates:
         update_data.update(updates)
 
-    await db.analyses.update_one(
-        {'id': analysis_id},
-        {'$set': update_data}
-    )
+    update = {'$set': update_data}
+    if heartbeat:
+        update['$currentDate'] = {'heartbeat': True}
+
+    await collection.update_one({'id': analysis_id}, update)
 
-    logger.info(f"Updated analysis {analysis_id} status to {status}")
+    logger.debug("Updated analysis %s status to %s", analysis_id, status)
@@ -1,45 +1,155 @@
 """Celery application configuration"""
 
+import asyncio
 import logging
+from typing import Any, Dict, Optional
+import orjson
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
+from kombu.serialization import register
 from app.core.config import settings
+from app.core.database import connect_databases, disconnect_databases
 
 logger = logging.getLogger(__name__)
 
+
+def _orjson_dumps(obj: Any) -> bytes:
+    """Encode task/result payloads with orjson (int dict keys allowed, like stdlib json)"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+# Analysis results carry large vulnerability/transcript blobs; orjson encodes them much faster
+register(
+    'orjson',
+    _orjson_dumps,
+    orjson.loads,
+    content_type='application/x-orjson',
+    content_encoding='utf-8'
+)
+
 # Create Celery instance
 celery_app = Celery(
     "protectsus",
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND,
-    include=['app.tasks.analysis_tasks', 'app.tasks.pr_workflow_tasks']
+    include=['app.tasks.analysis_tasks', 'app.tasks.pr_workflow_tasks', 'app.tasks.graph_tasks']
 )
 
 # Celery configuration
 celery_app.conf.update(
-    task_serializer='json',
-    accept_content=['json'],
-    result_serializer='json',
+    task_serializer='orjson',
+    accept_content=['orjson', 'json'],  # json still accepted for messages queued before the switch
+    result_serializer='orjson',
     timezone='UTC',
     enable_utc=True,
     task_track_started=True,
     task_time_limit=1800,  # 30 minutes
     task_soft_time_limit=1500,  # 25 minutes
     worker_prefetch_multiplier=1,
-    worker_max_tasks_per_child=10,
+    worker_max_tasks_per_child=1000,  # Connections persist per process, so recycle rarely
+    worker_max_memory_per_child=1_500_000,  # KiB (~1.5 GB); recycle on real memory growth instead
     broker_connection_retry_on_startup=True,  # Fix deprecation warning
+    # Keep idle broker/backend connections alive instead of reconnecting after NAT/LB timeouts
+    broker_transport_options={'socket_keepalive': True, 'socket_keepalive_options': {}},
+    redis_socket_keepalive=True,
+    # Neo4j writes and multi-minute fix regenerations (denials regenerate inline)
+    # get their own queues so analysis and PR approval tasks never wait behind them
+    task_routes={
+        'app.tasks.graph_tasks.*': {'queue': 'graph'},
+        'handle_pr_denial': {'queue': 'regeneration'},
+        'regenerate_fix_with_feedback': {'queue': 'regeneration'},
+    },
 )
 
-# Initialize Phoenix tracing for Celery worker
-print(f"[CELERY_APP] PHOENIX_ENABLED: {settings.PHOENIX_ENABLED}")
-try:
-    if settings.PHOENIX_ENABLED:
+# Long-lived event loop per worker process so database pools survive across tasks
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+_databases_connected = False
+
+
+def _new_event_loop() -> asyncio.AbstractEventLoop:
+    """Create a uvloop loop when enabled and installed, else a stock asyncio loop"""
+    if settings.CELERY_USE_UVLOOP:
+        try:
+            import uvloop
+            return uvloop.new_event_loop()
+        except ImportError:
+            logger.warning("CELERY_USE_UVLOOP is set but uvloop is not installed")
+    return asyncio.new_event_loop()
+
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    """
+    Get this process's persistent event loop, creating it if needed
+
+    Databases are connected on the loop the first time it is handed out and
+    stay connected until worker_process_shutdown, so tasks never connect or
+    disconnect themselves. This also covers pools (solo, threads) that never
+    send worker_process_init.
+    """
+    global _worker_loop, _databases_connected
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = _new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+        _databases_connected = False
+    if not _databases_connected:
+        _worker_loop.run_until_complete(connect_databases())
+        _databases_connected = True
+        logger.info("Worker process connected to databases")
+    return _worker_loop
+
+
+# Stateless services shared by every task in this worker process, keyed by class
+_worker_services: Dict[type, Any] = {}
+
+
+def get_worker_service(service_cls: type) -> Any:
+    """Get this process's shared instance of a stateless service, creating it on first use"""
+    service = _worker_services.get(service_cls)
+    if service is None:
+        service = _worker_services[service_cls] = service_cls()
+    return service
+
+
+@worker_process_init.connect
+def _init_worker_process(**kwargs):
+    """Set up tracing and connect databases once when a worker process starts"""
+    _init_phoenix_tracing()
+
+    loop = get_worker_loop()
+
+    from app.services.knowledge_graph_service import KnowledgeGraphService
+    try:
+        loop.run_until_complete(KnowledgeGraphService.ensure_indexes())
+    except Exception as e:
+        logger.warning("Could not ensure knowledge graph indexes: %s", e)
+
+
+@worker_process_shutdown.connect
+def _shutdown_worker_process(**kwargs):
+    """Disconnect databases and close the loop when a worker process exits"""
+    global _worker_loop, _databases_connected
+    _worker_services.clear()
+    if _worker_loop is None or _worker_loop.is_closed():
+        return
+    try:
+        if _databases_connected:
+            _worker_loop.run_until_complete(disconnect_databases())
+    finally:
+        _worker_loop.close()
+        _worker_loop = None
+        _databases_connected = False
+
+
+def _init_phoenix_tracing():
+    """Initialize Phoenix tracing for this Celery worker process"""
+    if not settings.PHOENIX_ENABLED:
+        logger.debug("Phoenix tracing is disabled")
+        return
+
+    try:
         from app.core.tracing import setup_phoenix_tracing
-        
+
         phoenix_url = settings.phoenix_url
-        print(f"[CELERY_APP] Phoenix URL: {phoenix_url}")
-        print(f"[CELERY_APP] PHOENIX_API_KEY present: {bool(settings.PHOENIX_API_KEY)}")
-        print(f"[CELERY_APP] Initializing Phoenix tracing for Celery worker...")
-        
         tracer = setup_phoenix_tracing(
             project_name="protectsus-celery-worker",
             enabled=settings.PHOENIX_ENABLED,
@@ -47,14 +157,10 @@ try:
             base_url=phoenix_url,
             client_headers=settings.PHOENIX_CLIENT_HEADERS
         )
-        
+
         if tracer:
-            print(f"[CELERY_APP] ✓ Phoenix tracing initialized at {phoenix_url}")
+            logger.info("Phoenix tracing initialized at %s", phoenix_url)
         else:
-            print("[CELERY_APP] ⚠ Phoenix tracing initialization returned None")
-    else:
-        print("[CELERY_APP] Phoenix tracing is disabled")
-except Exception as e:
-    print(f"[CELERY_APP] ❌ Failed to initialize Phoenix: {e}")
-    import traceback
-    traceback.print_exc()
+            logger.warning("Phoenix tracing initialization returned None")
+    except Exception as e:
+        logger.error("Failed to initialize Phoenix tracing: %s", e, exc_info=True)
@@ -1,15 +1,62 @@
 """Background tasks for knowledge graph indexing"""
 
-from celery import shared_task
+from typing import Any, Dict, List
+from celery import group, shared_task
+import asyncio
+import json
 import logging
 
+from app.core.config import settings
+from app.core.database import RedisDB
 from app.services.github_service import GitHubService
 from app.services.knowledge_graph_service import KnowledgeGraphService
+from app.services.task_lock_service import TaskLockService
+from app.tasks.celery_app import get_worker_loop, get_worker_service
 
 logger = logging.getLogger(__name__)
 
+# Matches the analysis task's Step 3 lock; expires if a worker dies mid-index
+INDEX_LOCK_TTL = 1800
 
-@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+# Bulk reindex: concurrent GitHub lookups, and how long a resolved branch head is reused
+REINDEX_CONCURRENCY = 16
+REPO_HEAD_CACHE_TTL = 300
+
+# Concurrent clones per GitHub account across all workers, to stay under
+# GitHub's secondary rate limits during bulk reindexes
+CLONE_CONCURRENCY = 4
+CLONE_SLOT_TTL = 600
+CLONE_SLOT_WAIT = 300
+
+
+def _count_lines(code_files: List[Dict[str, Any]]) -> List[int]:
+    """Line count per file (0 for empty files)"""
+    return [
+        f["content"].count("\n") + 1 if f.get("content") else 0
+        for f in code_files
+    ]
+
+
+def _resolve_repo_head(github_service: GitHubService, repo_full_name: str) -> Dict[str, str]:
+    """Look up a repo's default-branch head and clone URL (blocking PyGithub calls)"""
+    gh = github_service.get_installation_client(repo_full_name)
+    repo = gh.get_repo(repo_full_name)
+    branch = repo.get_branch(repo.default_branch)
+    return {
+        "repo_full_name": repo_full_name,
+        "commit_sha": branch.commit.sha,
+        "clone_url": repo.clone_url
+    }
+
+
+# Graph writes are MERGEs, so redelivery after a lost worker is safe
+@shared_task(
+    bind=True,
+    max_retries=3,
+    default_retry_delay=60,
+    acks_late=True,
+    reject_on_worker_lost=True
+)
 def trigger_graph_indexing_task(
     self,
     repo_full_name: str,
@@ -29,38 +76,61 @@ def trigger_graph_indexing_task(
         commit_sha: Commit SHA to index
         clone_url: Repository clone URL
     """
-    import asyncio
-    
     async def _index():
-        logger.info(f"Starting graph indexing for {repo_full_name} at {commit_sha}")
+        logger.info("Starting graph indexing for %s at %s", repo_full_name, commit_sha)
         
-        github_service = GitHubService()
+        github_service = get_worker_service(GitHubService)
         repo_path = None
         
+        # Skip if another indexing task is writing File nodes for this commit. This is
+        # separate from analysis Step 3's lock, which must still parse the full structure.
+        # A redelivered message keeps its task id, so our own stale lock doesn't count
+        lock_key = TaskLockService.lock_key("index-files", repo_full_name, commit_sha)
+        lock_owner = self.request.id or repo_full_name
+        if (
+            not await TaskLockService.acquire(lock_key, lock_owner, INDEX_LOCK_TTL)
+            and await TaskLockService.get_owner(lock_key) != lock_owner
+        ):
+            logger.info("Indexing for %s@%s already in progress, skipping", repo_full_name, commit_sha[:7])
+            return {"status": "skipped", "repository": repo_full_name}
+        
         try:
-            # Clone repository at specific commit
-            repo_path = await github_service.clone_repository(
-                repo_full_name,
-                commit_sha,
-                clone_url
+            # Clone repository at specific commit, holding one of the account's clone slots;
+            # a timeout here falls through to the retry below
+            clone_key = f"sem:clone:{repo_full_name.split('/')[0]}"
+            await TaskLockService.acquire_slot(
+                clone_key,
+                lock_owner,
+                CLONE_CONCURRENCY,
+                CLONE_SLOT_TTL,
+                CLONE_SLOT_WAIT
             )
+            try:
+                repo_path = await github_service.clone_repository(
+                    repo_full_name,
+                    commit_sha,
+                    clone_url
+                )
+            finally:
+                await TaskLockService.release_slot(clone_key, lock_owner)
             
             # Get all code files
             code_files = await github_service.get_code_files(repo_path)
             
             if not code_files:
-                logger.warning(f"No code files found in {repo_full_name}")
+                logger.warning("No code files found in %s", repo_full_name)
                 return {"status": "completed", "files_indexed": 0}
             
-            # Build code structure
+            # Build code structure; counting lines scans every byte, so do it off the loop
+            line_counts = await asyncio.to_thread(_count_lines, code_files)
             code_structure = {
                 "files": [
                     {
                         "path": f["path"],
                         "language": f["extension"].lstrip(".") if f.get("extension") else "unknown",
-                        "line_count": f["content"].count("\n") + 1 if f.get("content") else 0
+                        "line_count": line_count
                     }
-                    for f in code_files
+                    for f, line_count in zip(code_files, line_counts)
                 ],
                 "functions": [],
                 "classes": [],
@@ -68,19 +138,28 @@ def trigger_graph_indexing_task(
                 "calls": []
             }
             
-            # Create repository node
-            await KnowledgeGraphService.create_repository_node(
-                repo_full_name,
-                {"created_at": "now"}
+            # Large repos go through LOAD CSV when Neo4j shares an import dir with us;
+            # otherwise write it in committed UNWIND batches
+            node_count = sum(
+                len(code_structure[key]) for key in ("files", "functions", "classes")
             )
+            if settings.NEO4J_IMPORT_DIR and node_count > settings.NEO4J_CSV_IMPORT_THRESHOLD:
+                await KnowledgeGraphService.bulk_import_csv(
+                    repo_full_name,
+                    code_structure,
+                    code_files=code_files
+                )
+            else:
+                await KnowledgeGraphService.bulk_ingest(
+                    repo_full_name,
+                    code_structure,
+                    code_files=code_files
+                )
             
-            # Index full codebase structure
-            await KnowledgeGraphService.index_codebase(repo_full_name, code_structure)
-            
-            # Create file nodes for visualization
-            await KnowledgeGraphService.create_file_nodes(repo_full_name, code_files)
+            # No "indexed:" flag here: this task writes File nodes only, so analysis
+            # Step 3 must still parse functions, classes and calls for this commit
             
-            logger.info(f"Successfully indexed {len(code_files)} files for {repo_full_name}")
+            logger.info("Successfully indexed %s files for %s", len(code_files), repo_full_name)
             
             return {
                 "status": "completed",
@@ -89,21 +168,17 @@ def trigger_graph_indexing_task(
             }
             
         except Exception as e:
-            logger.error(f"Error indexing graph for {repo_full_name}: {e}", exc_info=True)
+            logger.error("Error indexing graph for %s: %s", repo_full_name, e, exc_info=True)
             raise self.retry(exc=e)
             
         finally:
+            await TaskLockService.release(lock_key, lock_owner)
             # Cleanup cloned repository
             if repo_path:
                 github_service.cleanup_repo(repo_path)
     
-    # Run async function in event loop
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        return loop.run_until_complete(_index())
-    finally:
-        loop.close()
+    # Run on the worker's persistent event loop
+    return get_worker_loop().run_until_complete(_index())
 
 
 @shared_task(bind=True, max_retries=2)
@@ -116,18 +191,20 @@ def reindex_all_user_repos_task(self, user_id: str):
     Args:
         user_id: GitHub user ID
     """
-    import asyncio
     from app.core.database import MongoDB
     
     async def _reindex_all():
-        logger.info(f"Starting bulk reindex for user {user_id}")
+        logger.info("Starting bulk reindex for user %s", user_id)
         
         try:
             db = MongoDB.get_database()
-            user = await db.users.find_one({"github_id": int(user_id)})
+            user = await db.users.find_one(
+                {"github_id": int(user_id)},
+                {"installations.repositories": 1}
+            )
             
             if not user:
-                logger.warning(f"User {user_id} not found")
+                logger.warning("User %s not found", user_id)
                 return {"status": "failed", "error": "User not found"}
             
             repos = []
@@ -135,34 +212,40 @@ def reindex_all_user_repos_task(self, user_id: str):
                 repos.extend(installation.get("repositories", []))
             
             if not repos:
-                logger.info(f"No repositories found for user {user_id}")
+                logger.info("No repositories found for user %s", user_id)
                 return {"status": "completed", "repos_indexed": 0}
             
-            github_service = GitHubService()
-            indexed_count = 0
+            github_service = get_worker_service(GitHubService)
+            redis = RedisDB.get_client()
+            semaphore = asyncio.Semaphore(REINDEX_CONCURRENCY)
             
-            for repo_full_name in repos:
+            async def _resolve(repo_full_name: str):
+                # Get latest commit from default branch, reusing a recent lookup
+                cache_key = f"repo-head:{repo_full_name}"
                 try:
-                    # Get latest commit from default branch
-                    gh = github_service.get_installation_client(repo_full_name)
-                    repo = gh.get_repo(repo_full_name)
-                    default_branch = repo.default_branch
-                    branch = repo.get_branch(default_branch)
-                    commit_sha = branch.commit.sha
-                    clone_url = repo.clone_url
+                    cached = await redis.get(cache_key)
+                    if cached:
+                        return json.loads(cached)
                     
-                    # Trigger individual indexing task
-                    trigger_graph_indexing_task.delay(
-                        repo_full_name=repo_full_name,
-                        commit_sha=commit_sha,
-                        clone_url=clone_url
-                    )
-                    indexed_count += 1
+                    async with semaphore:
+                        head = await asyncio.to_thread(
+                            _resolve_repo_head, github_service, repo_full_name
+                        )
+                    await redis.setex(cache_key, REPO_HEAD_CACHE_TTL, json.dumps(head))
+                    return head
                     
                 except Exception as repo_err:
-                    logger.warning(f"Failed to queue indexing for {repo_full_name}: {repo_err}")
+                    logger.warning("Failed to queue indexing for %s: %s", repo_full_name, repo_err)
+                    return None
+            
+            heads = [head for head in await asyncio.gather(*map(_resolve, repos)) if head]
             
-            logger.info(f"Queued indexing for {indexed_count} repositories for user {user_id}")
+            # Trigger all indexing tasks in one broker round
+            if heads:
+                group(trigger_graph_indexing_task.s(**head) for head in heads).apply_async()
+            indexed_count = len(heads)
+            
+            logger.info("Queued indexing for %s repositories for user %s", indexed_count, user_id)
             
             return {
                 "status": "completed",
@@ -170,13 +253,53 @@ def reindex_all_user_repos_task(self, user_id: str):
             }
             
         except Exception as e:
-            logger.error(f"Error in bulk reindex for user {user_id}: {e}", exc_info=True)
+            logger.error("Error in bulk reindex for user %s: %s", user_id, e, exc_info=True)
+            raise self.retry(exc=e)
+    
+    # Run on the worker's persistent event loop
+    return get_worker_loop().run_until_complete(_reindex_all())
+
+
+@shared_task(
+    bind=True,
+    max_retries=3,
+    default_retry_delay=30,
+    acks_late=True,
+    reject_on_worker_lost=True
+)
+def write_summary_node_task(
+    self,
+    analysis_id: str,
+    repo_full_name: str,
+    summary: str,
+    debate_highlights: List[str] = None
+):
+    """
+    Background task to write an analysis summary node to the knowledge graph.
+    
+    Queued by the analysis task once results are saved, so Neo4j latency
+    never delays the analysis itself.
+    
+    Args:
+        analysis_id: Analysis ID
+        repo_full_name: Full repository name (owner/repo)
+        summary: Final analysis summary
+        debate_highlights: Key reasoning points from the agent debate
+    """
+    async def _write():
+        try:
+            await KnowledgeGraphService.create_analysis_summary_node(
+                analysis_id=analysis_id,
+                repo_full_name=repo_full_name,
+                summary=summary,
+                debate_highlights=debate_highlights
+            )
+            logger.info("Saved analysis summary for %s to Neo4j", analysis_id)
+            return {"status": "completed", "analysis_id": analysis_id}
+            
+        except Exception as e:
+            logger.error("Error saving analysis summary for %s: %s", analysis_id, e, exc_info=True)
             raise self.retry(exc=e)
     
-    # Run async function
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        return loop.run_until_complete(_reindex_all())
-    finally:
-        loop.close()
+    # Run on the worker's persistent event loop
+    return get_worker_loop().run_until_complete(_write())
@@ -2,14 +2,17 @@
 
 import asyncio
 import logging
-from typing import Optional
+import os
+from typing import Any, Dict, Optional
 
-from app.tasks.celery_app import celery_app
+from app.tasks.celery_app import celery_app, get_worker_loop, get_worker_service
 from app.services.pr_workflow_service import PRWorkflowService
-from app.core.database import connect_databases, disconnect_databases
 
 logger = logging.getLogger(__name__)
 
+# Concurrent RAG pattern lookups during fix regeneration
+RAG_LOOKUP_CONCURRENCY = 8
+
 
 @celery_app.task(bind=True, name='handle_pr_approval')
 def handle_pr_approval(
@@ -28,8 +31,8 @@ def handle_pr_approval(
     """
     logger.info(f"Starting PR approval task for {repo_full_name} PR #{pr_number}")
 
-    # Run async code in event loop
-    loop = asyncio.get_event_loop()
+    # Run on the worker's persistent loop so database pools are reused
+    loop = get_worker_loop()
     return loop.run_until_complete(
         _handle_pr_approval_async(
             repo_full_name,
@@ -46,9 +49,6 @@ async def _handle_pr_approval_async(
 ):
     """Async implementation of PR approval workflow"""
     try:
-        # Ensure database is connected
-        await connect_databases()
-
         # Execute approval workflow
         result = await PRWorkflowService.handle_approve(
             repo_full_name=repo_full_name,
@@ -66,8 +66,6 @@ async def _handle_pr_approval_async(
             'reason': 'internal_error',
             'message': str(e)
         }
-    finally:
-        await disconnect_databases()
 
 
 @celery_app.task(bind=True, name='handle_pr_denial')
@@ -79,7 +77,7 @@ def handle_pr_denial(
     commenter: str
 ):
     """
-    Process PR denial and queue regeneration asynchronously
+    Process PR denial and regenerate the fix in the same task
 
     Args:
         repo_full_name: Full repository name (owner/repo)
@@ -89,8 +87,8 @@ def handle_pr_denial(
     """
     logger.info(f"Starting PR denial task for {repo_full_name} PR #{pr_number}")
 
-    # Run async code in event loop
-    loop = asyncio.get_event_loop()
+    # Run on the worker's persistent loop so database pools are reused
+    loop = get_worker_loop()
     return loop.run_until_complete(
         _handle_pr_denial_async(
             repo_full_name,
@@ -109,9 +107,6 @@ async def _handle_pr_denial_async(
 ):
     """Async implementation of PR denial workflow"""
     try:
-        # Ensure database is connected
-        await connect_databases()
-
         # Execute denial workflow
         result = await PRWorkflowService.handle_deny(
             repo_full_name=repo_full_name,
@@ -120,24 +115,28 @@ async def _handle_pr_denial_async(
             commenter=commenter
         )
 
+        # The analysis snapshot is for regeneration only; it isn't part of the task result
+        analysis_snapshot = result.pop('analysis', None)
+
         logger.info(f"PR denial workflow completed: {result}")
 
-        # If denial was successful, queue regeneration task
+        # If denial was successful, regenerate right here rather than through another
+        # broker hop; this task already runs on the regeneration queue
         if result.get('success') and result.get('regeneration_queued'):
             analysis_id = result.get('analysis_id')
             iteration_number = result.get('iteration_number', 1)
 
             logger.info(
-                f"Queueing fix regeneration for analysis {analysis_id}, "
+                f"Regenerating fix for analysis {analysis_id}, "
                 f"iteration {iteration_number} -> {iteration_number + 1}"
             )
 
-            # Queue regeneration task
-            regenerate_fix_with_feedback.delay(
+            result['regeneration'] = await _regenerate_fix_async(
                 analysis_id=analysis_id,
                 old_pr_number=pr_number,
                 feedback_text=feedback_text,
-                iteration_number=iteration_number + 1
+                iteration_number=iteration_number + 1,
+                analysis_snapshot=analysis_snapshot
             )
 
         return result
@@ -149,8 +148,6 @@ async def _handle_pr_denial_async(
             'reason': 'internal_error',
             'message': str(e)
         }
-    finally:
-        await disconnect_databases()
 
 
 @celery_app.task(bind=True, name='regenerate_fix_with_feedback')
@@ -175,8 +172,8 @@ def regenerate_fix_with_feedback(
         f"iteration {iteration_number}"
     )
 
-    # Run async code in event loop
-    loop = asyncio.get_event_loop()
+    # Run on the worker's persistent loop so database pools are reused
+    loop = get_worker_loop()
     return loop.run_until_complete(
         _regenerate_fix_async(
             analysis_id,
@@ -191,9 +188,15 @@ async def _regenerate_fix_async(
     analysis_id: str,
     old_pr_number: int,
     feedback_text: str,
-    iteration_number: int
+    iteration_number: int,
+    analysis_snapshot: Optional[Dict[str, Any]] = None
 ):
-    """Async implementation of fix regeneration with RL guidance"""
+    """
+    Async implementation of fix regeneration with RL guidance
+
+    analysis_snapshot is the already-loaded original analysis (as updated by
+    handle_deny); without it the analysis is read from MongoDB.
+    """
     try:
         from app.core.database import MongoDB
         from app.services.rl_service import RLService
@@ -201,16 +204,15 @@ async def _regenerate_fix_async(
         from app.services.fix_service import FixService
         from app.services.github_service import GitHubService
         import uuid
-        from datetime import datetime
-        from pathlib import Path
+        from datetime import datetime, timezone
 
-        # Ensure database is connected
-        await connect_databases()
+        # When this regeneration started; recorded as the new analysis's created_at
+        started_at = datetime.now(timezone.utc)
 
         db = MongoDB.get_database()
 
         # 1. Get original analysis
-        original_analysis = await db.analyses.find_one({'id': analysis_id})
+        original_analysis = analysis_snapshot or await db.analyses.find_one({'id': analysis_id})
         if not original_analysis:
             logger.error(f"Analysis {analysis_id} not found")
             return {'success': False, 'reason': 'analysis_not_found'}
@@ -227,48 +229,60 @@ async def _regenerate_fix_async(
 
         logger.info(f"RL guidance received: {rl_guidance}")
 
-        # 3. Get similar successful patterns from RAG
+        # 3. Get similar successful patterns from RAG (lookups are independent, so run them concurrently)
         vulnerabilities = original_analysis.get('vulnerabilities', [])
-        rag_patterns = []
+        rag_semaphore = asyncio.Semaphore(RAG_LOOKUP_CONCURRENCY)
 
-        for vuln in vulnerabilities:
+        async def lookup_patterns(vuln):
             file_path = vuln.get('file_path', '')
-            file_extension = Path(file_path).suffix or 'unknown'
-
-            patterns = await FixPatternService.get_similar_patterns(
-                vulnerability_type=vuln.get('type', 'UNKNOWN'),
-                file_extension=file_extension,
-                severity=vuln.get('severity'),
-                limit=3
-            )
-            rag_patterns.extend(patterns)
+            file_extension = os.path.splitext(file_path)[1] or 'unknown'
+
+            async with rag_semaphore:
+                return await FixPatternService.get_similar_patterns(
+                    vulnerability_type=vuln.get('type', 'UNKNOWN'),
+                    file_extension=file_extension,
+                    severity=vuln.get('severity'),
+                    limit=3
+                )
+
+        results = await asyncio.gather(
+            *(lookup_patterns(vuln) for vuln in vulnerabilities),
+            return_exceptions=True
+        )
+        rag_patterns = []
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"Pattern lookup failed: {result}")
+                continue
+            rag_patterns.extend(result)
 
         logger.info(f"Retrieved {len(rag_patterns)} similar successful patterns from RAG")
 
-        # 4. Create new analysis record for this iteration
+        # 4. Build the new analysis record for this iteration; it is written once, after the PR exists
         new_analysis_id = f"analysis_{uuid.uuid4().hex[:12]}"
         new_analysis = {
             'id': new_analysis_id,
             'repo_full_name': repo_full_name,
             'commit_sha': commit_sha,
-            'status': 'in_progress',
+            'status': 'completed',
             'parent_analysis_id': analysis_id,
             'iteration_number': iteration_number,
             'previous_pr_numbers': original_analysis.get('previous_pr_numbers', []) + [old_pr_number],
             'rl_guidance_applied': True,
-            'created_at': datetime.utcnow(),
+            'created_at': started_at,
             'vulnerabilities': vulnerabilities,
             'dependency_risks': original_analysis.get('dependency_risks', [])
         }
 
-        await db.analyses.insert_one(new_analysis)
-        logger.info(f"Created new analysis {new_analysis_id} for iteration {iteration_number}")
-
         # 5. Re-run fix generation with RL guidance and RAG patterns
-        fix_service = FixService()
+        fix_service = get_worker_service(FixService)
 
-        # Get code files from original analysis
-        code_files = original_analysis.get('code_files', [])
+        # Get code files from original analysis (older analyses embedded them)
+        original_results = await db.analysis_results.find_one(
+            {'analysis_id': analysis_id},
+            {'code_files': 1}
+        )
+        code_files = (original_results or original_analysis).get('code_files', [])
         if not code_files:
             logger.warning("No code files found in original analysis")
 
@@ -289,10 +303,10 @@ async def _regenerate_fix_async(
         logger.info(f"Generated {len(fixes)} refined fixes with RL guidance")
 
         # 6. Create new PR with refined fixes
-        github_service = GitHubService()
+        github_service = get_worker_service(GitHubService)
 
         # Build analysis summary with iteration info
-        analysis_summary = f"""## 🔄 Refined Security Fixes (Iteration {iteration_number})
+        summary_header = f"""## 🔄 Refined Security Fixes (Iteration {iteration_number})
 
 ### 📝 User Feedback from Iteration {iteration_number - 1}
 > {feedback_text}
@@ -305,8 +319,12 @@ async def _regenerate_fix_async(
 ### 🔍 Original Findings
 {len(vulnerabilities)} vulnerabilities detected:
 """
-        for vuln in vulnerabilities:
-            analysis_summary += f"- **{vuln.get('type')}** ({vuln.get('severity')}) in `{vuln.get('file_path')}`\n"
+        summary_parts = [summary_header]
+        summary_parts.extend(
+            f"- **{vuln.get('type')}** ({vuln.get('severity')}) in `{vuln.get('file_path')}`\n"
+            for vuln in vulnerabilities
+        )
+        analysis_summary = "".join(summary_parts)
 
         # Create PR
         pr_result = await github_service.create_fix_pr(
@@ -322,36 +340,50 @@ async def _regenerate_fix_async(
 
         logger.info(f"Created new PR #{new_pr_number}: {new_pr_url}")
 
-        # 7. Update new analysis with PR info
-        await db.analyses.update_one(
-            {'id': new_analysis_id},
-            {
-                '$set': {
-                    'status': 'completed',
-                    'pr_number': new_pr_number,
-                    'pr_url': new_pr_url,
-                    'fixes': fixes,
-                    'completed_at': datetime.utcnow()
-                }
-            }
-        )
-
-        # 8. Add comment to old PR with link to new one (PR was already closed in handle_deny)
+        # 7. Add comment to old PR with link to new one (PR was already closed in handle_deny).
+        # Best effort, so it overlaps with saving the analysis instead of running after it.
+        async def comment_on_old_pr():
+            try:
+                await github_service.add_pr_comment(
+                    repo_full_name=repo_full_name,
+                    pr_number=old_pr_number,
+                    comment=f"🔄 **New improved fix PR created!**\n\n"
+                            f"Based on your feedback, a refined fix has been generated:\n"
+                            f"→ **New PR**: #{new_pr_number}\n\n"
+                            f"**Improvements**:\n"
+                            f"- Applied reinforcement learning guidance\n"
+                            f"- Incorporated {len(rag_patterns)} similar successful patterns\n"
+                            f"- Iteration {iteration_number}/{PRWorkflowService.MAX_ITERATIONS}\n\n"
+                            f"Please review the new PR: {new_pr_url}"
+                )
+            except Exception as e:
+                logger.warning(f"Could not add comment to old PR #{old_pr_number}: {e}")
+
+        comment_task = asyncio.create_task(comment_on_old_pr())
+
+        # 8. Save the new analysis in its final state, alongside its results
+        new_analysis.update({
+            'pr_number': new_pr_number,
+            'pr_url': new_pr_url,
+            'completed_at': datetime.now(timezone.utc)
+        })
         try:
-            await github_service.add_pr_comment(
-                repo_full_name=repo_full_name,
-                pr_number=old_pr_number,
-                comment=f"🔄 **New improved fix PR created!**\n\n"
-                        f"Based on your feedback, a refined fix has been generated:\n"
-                        f"→ **New PR**: #{new_pr_number}\n\n"
-                        f"**Improvements**:\n"
-                        f"- Applied reinforcement learning guidance\n"
-                        f"- Incorporated {len(rag_patterns)} similar successful patterns\n"
-                        f"- Iteration {iteration_number}/{PRWorkflowService.MAX_ITERATIONS}\n\n"
-                        f"Please review the new PR: {new_pr_url}"
+            await asyncio.gather(
+                db.analyses.insert_one(new_analysis),
+                db.analysis_results.replace_one(
+                    {'analysis_id': new_analysis_id},
+                    {
+                        'analysis_id': new_analysis_id,
+                        'code_files': code_files,
+                        'fixes': fixes
+                    },
+                    upsert=True
+                )
             )
-        except Exception as e:
-            logger.warning(f"Could not add comment to old PR #{old_pr_number}: {e}")
+        finally:
+            # Never leave the comment pending on the worker loop after this task returns
+            await comment_task
+        logger.info(f"Created new analysis {new_analysis_id} for iteration {iteration_number}")
 
         logger.info(f"Created new PR #{new_pr_number} to replace old PR #{old_pr_number}")
 
@@ -372,5 +404,3 @@ async def _regenerate_fix_async(
             'reason': 'internal_error',
             'message': str(e)
         }
-    finally:
-        await disconnect_databases()
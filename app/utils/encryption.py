@@ -1,17 +1,29 @@
 """Encryption utilities for secure token storage"""
 
 from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from functools import lru_cache
 import base64
+import hashlib
+import hmac
+import logging
+import os
+import ssl
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
 
+# Prefix marking AES-GCM tokens; Fernet tokens are plain urlsafe base64 and never contain ':'
+TOKEN_V2_PREFIX = "v2:"
+
+
+@lru_cache(maxsize=1)
 def _get_encryption_key() -> bytes:
     """
     Derive encryption key from SECRET_KEY using PBKDF2.
 
+    The derivation is deliberately slow, so the result is cached per process.
+
     Returns:
         bytes: Encryption key suitable for Fernet
     """
@@ -19,18 +31,43 @@ def _get_encryption_key() -> bytes:
     # In production, you might want to store this separately
     salt = b'protectsus_token_encryption_salt'
 
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=32,
-        salt=salt,
-        iterations=100000,
-        backend=default_backend()
+    # hashlib runs this through OpenSSL's EVP SHA-256 (SHA-NI where available);
+    # output is identical to cryptography's PBKDF2HMAC, so existing tokens still decrypt
+    derived = hashlib.pbkdf2_hmac(
+        'sha256',
+        settings.SECRET_KEY.encode(),
+        salt,
+        100000,
+        dklen=32
     )
+    logger.debug(f"Derived token encryption key using {ssl.OPENSSL_VERSION}")
 
-    key = base64.urlsafe_b64encode(kdf.derive(settings.SECRET_KEY.encode()))
+    key = base64.urlsafe_b64encode(derived)
     return key
 
 
+@lru_cache(maxsize=1)
+def _get_fernet() -> Fernet:
+    """Get the shared Fernet instance for the derived key"""
+    return Fernet(_get_encryption_key())
+
+
+@lru_cache(maxsize=1)
+def _get_aesgcm() -> AESGCM:
+    """Get the shared AES-256-GCM instance, keyed separately from Fernet"""
+    master_key = base64.urlsafe_b64decode(_get_encryption_key())
+    # Domain-separate the GCM key so the same key material isn't used by two ciphers
+    gcm_key = hmac.new(master_key, b'protectsus_token_encryption_v2', hashlib.sha256).digest()
+    return AESGCM(gcm_key)
+
+
+def reset_encryption_cache() -> None:
+    """Drop the cached keys and cipher instances (e.g. after rotating SECRET_KEY)"""
+    _get_aesgcm.cache_clear()
+    _get_fernet.cache_clear()
+    _get_encryption_key.cache_clear()
+
+
 def encrypt_token(token: str) -> str:
     """
     Encrypt a token using Fernet symmetric encryption.
@@ -41,15 +78,28 @@ def encrypt_token(token: str) -> str:
     Returns:
         str: Encrypted token (base64 encoded)
     """
-    key = _get_encryption_key()
-    f = Fernet(key)
-    encrypted_token = f.encrypt(token.encode())
+    encrypted_token = _get_fernet().encrypt(token.encode())
     return encrypted_token.decode()
 
 
+def encrypt_token_v2(token: str) -> str:
+    """
+    Encrypt a token using AES-256-GCM.
+
+    Args:
+        token: Plain text token to encrypt
+
+    Returns:
+        str: "v2:" followed by the base64 encoded nonce and ciphertext
+    """
+    nonce = os.urandom(12)
+    ciphertext = _get_aesgcm().encrypt(nonce, token.encode(), None)
+    return TOKEN_V2_PREFIX + base64.urlsafe_b64encode(nonce + ciphertext).decode()
+
+
 def decrypt_token(encrypted_token: str) -> str:
     """
-    Decrypt an encrypted token.
+    Decrypt an encrypted token (AES-GCM "v2:" tokens or legacy Fernet tokens).
 
     Args:
         encrypted_token: Encrypted token (base64 encoded)
@@ -58,9 +108,13 @@ def decrypt_token(encrypted_token: str) -> str:
         str: Decrypted plain text token
 
     Raises:
-        cryptography.fernet.InvalidToken: If decryption fails
+        cryptography.fernet.InvalidToken: If Fernet decryption fails
+        cryptography.exceptions.InvalidTag: If AES-GCM decryption fails
     """
-    key = _get_encryption_key()
-    f = Fernet(key)
-    decrypted_token = f.decrypt(encrypted_token.encode())
+    if encrypted_token.startswith(TOKEN_V2_PREFIX):
+        payload = base64.urlsafe_b64decode(encrypted_token[len(TOKEN_V2_PREFIX):])
+        decrypted_token = _get_aesgcm().decrypt(payload[:12], payload[12:], None)
+        return decrypted_token.decode()
+
+    decrypted_token = _get_fernet().decrypt(encrypted_token.encode())
     return decrypted_token.decode()
@@ -25,21 +25,22 @@ async def setup_mongodb():
     # Create collections
     collections = ['analyses', 'user_feedback', 'code_embeddings', 'chat_history']
 
+    existing = set(await db.list_collection_names())
     for collection in collections:
-        if collection not in await db.list_collection_names():
+        if collection not in existing:
             await db.create_collection(collection)
             logger.info(f"Created collection: {collection}")
 
-    # Create indexes
-    await db.analyses.create_index([("id", 1)], unique=True)
-    await db.analyses.create_index([("repo_full_name", 1)])
-    await db.analyses.create_index([("created_at", -1)])
-
-    await db.user_feedback.create_index([("id", 1)], unique=True)
-    await db.user_feedback.create_index([("analysis_id", 1)])
-
-    await db.chat_history.create_index([("analysis_id", 1)])
-    await db.chat_history.create_index([("timestamp", 1)])
+    # Create indexes (idempotent, so issue them all at once)
+    await asyncio.gather(
+        db.analyses.create_index([("id", 1)], unique=True),
+        db.analyses.create_index([("repo_full_name", 1)]),
+        db.analyses.create_index([("created_at", -1)]),
+        db.user_feedback.create_index([("id", 1)], unique=True),
+        db.user_feedback.create_index([("analysis_id", 1)]),
+        db.chat_history.create_index([("analysis_id", 1)]),
+        db.chat_history.create_index([("timestamp", 1)]),
+    )
 
     logger.info("MongoDB setup complete")
 
@@ -55,33 +56,33 @@ async def setup_neo4j():
         auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
     )
 
+    # Create constraints and indexes
+    statements = [
+        "CREATE CONSTRAINT repo_unique IF NOT EXISTS FOR (r:Repository) REQUIRE r.full_name IS UNIQUE",
+        "CREATE CONSTRAINT vuln_unique IF NOT EXISTS FOR (v:Vulnerability) REQUIRE v.id IS UNIQUE",
+        "CREATE INDEX file_path_idx IF NOT EXISTS FOR (f:File) ON (f.path)",
+        "CREATE INDEX vuln_type_idx IF NOT EXISTS FOR (v:Vulnerability) ON (v.type)",
+        "CREATE INDEX dep_package_idx IF NOT EXISTS FOR (d:Dependency) ON (d.package_name)",
+    ]
+
+    async def create_schema(tx):
+        for statement in statements:
+            await tx.run(statement)
+
     async with driver.session() as session:
-        # Create constraints
-        constraints = [
-            "CREATE CONSTRAINT repo_unique IF NOT EXISTS FOR (r:Repository) REQUIRE r.full_name IS UNIQUE",
-            "CREATE CONSTRAINT vuln_unique IF NOT EXISTS FOR (v:Vulnerability) REQUIRE v.id IS UNIQUE",
-        ]
-
-        for constraint in constraints:
-            try:
-                await session.run(constraint)
-                logger.info(f"Created constraint: {constraint[:50]}...")
-            except Exception as e:
-                logger.warning(f"Constraint may already exist: {e}")
-
-        # Create indexes
-        indexes = [
-            "CREATE INDEX file_path_idx IF NOT EXISTS FOR (f:File) ON (f.path)",
-            "CREATE INDEX vuln_type_idx IF NOT EXISTS FOR (v:Vulnerability) ON (v.type)",
-            "CREATE INDEX dep_package_idx IF NOT EXISTS FOR (d:Dependency) ON (d.package_name)",
-        ]
-
-        for index in indexes:
-            try:
-                await session.run(index)
-                logger.info(f"Created index: {index[:50]}...")
-            except Exception as e:
-                logger.warning(f"Index may already exist: {e}")
+        try:
+            # One write transaction, one commit
+            await session.execute_write(create_schema)
+            logger.info(f"Created {len(statements)} constraints/indexes")
+        except Exception as e:
+            # Fall back to one statement at a time so a single conflict doesn't block the rest
+            logger.warning(f"Batched schema setup failed, retrying individually: {e}")
+            for statement in statements:
+                try:
+                    await session.run(statement)
+                    logger.info(f"Created: {statement[:50]}...")
+                except Exception as e:
+                    logger.warning(f"Constraint/index may already exist: {e}")
 
     await driver.close()
 
@@ -93,8 +94,7 @@ async def main():
     logger.info("Starting database setup...")
 
     try:
-        await setup_mongodb()
-        await setup_neo4j()
+        await asyncio.gather(setup_mongodb(), setup_neo4j())
         logger.info("✅ Database setup complete!")
 
     except Exception as e:
@@ -0,0 +1,58 @@
+"""Unit tests for multi-file code parsing"""
+
+import pytest
+
+from app.services.code_parser_service import CodeParserService
+
+
+class TestParseFiles:
+    """Test merging per-file structures into one code structure"""
+
+    @pytest.fixture
+    def code_files(self):
+        return [
+            {
+                "path": "app/a.py",
+                "content": "import os\n\n\nclass Child(Base):\n    def run(self):\n        helper()\n",
+            },
+            {
+                "path": "app/b.py",
+                "content": "def helper():\n    return 1\n",
+            },
+            {"path": "app/empty.py", "content": ""},
+            {"path": "", "content": "def skipped():\n    pass\n"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_merges_files(self, code_files):
+        """Test entries from every file are merged and tagged with their file"""
+        result = await CodeParserService.parse_files(code_files)
+
+        assert [f["path"] for f in result["files"]] == ["app/a.py", "app/b.py"]
+        assert result["files"][0]["language"] == "python"
+        assert result["files"][1]["line_count"] == 3
+
+        functions = {(func["file_path"], func["name"]) for func in result["functions"]}
+        assert functions == {("app/a.py", "run"), ("app/b.py", "helper")}
+
+        assert [(cls["file_path"], cls["name"], cls["bases"]) for cls in result["classes"]] == [
+            ("app/a.py", "Child", ["Base"])
+        ]
+        assert {imp["file_path"] for imp in result["imports"]} == {"app/a.py"}
+        assert ("app/a.py", "helper") in {(call["file_path"], call["name"]) for call in result["calls"]}
+
+    def test_sync_entry_point(self, code_files):
+        """Test the synchronous entry point used by the worker thread"""
+        result = CodeParserService.parse_files_sync(code_files)
+
+        assert len(result["files"]) == 2
+        assert len(result["functions"]) == 2
+
+    def test_unparseable_file_skipped(self):
+        """Test a file that fails to parse doesn't drop the rest of the batch"""
+        result = CodeParserService.parse_files_sync([
+            {"path": "broken.py", "content": "def broken(:\n"},
+            {"path": "ok.py", "content": "def ok():\n    pass\n"},
+        ])
+
+        assert ("ok.py", "ok") in {(func["file_path"], func["name"]) for func in result["functions"]}
@@ -0,0 +1,53 @@
+"""Unit tests for compression token estimates and passthrough"""
+
+import pytest
+
+from app.services.compression_service import CompressionService
+
+
+class TestTokenEstimate:
+    """Test the character-class token estimate"""
+
+    def test_ascii_text(self):
+        """Test plain ASCII counts a quarter token per character"""
+        assert CompressionService.estimate_tokens([{"path": "a.py", "content": "abcd" * 100}]) == 100
+
+    def test_digits_and_non_ascii(self):
+        """Test digits and non-ASCII characters are weighted more heavily"""
+        assert CompressionService.estimate_tokens([{"path": "a.py", "content": "1234" * 100}]) == 160
+        assert CompressionService.estimate_tokens([{"path": "a.txt", "content": "é" * 100}]) == 55
+
+    def test_missing_content(self):
+        """Test files without content count as empty"""
+        assert CompressionService.estimate_tokens([{"path": "a.py", "content": None}, {"path": "b.py"}]) == 0
+
+    def test_stops_past_limit(self):
+        """Test counting stops at the first file that pushes the estimate over the limit"""
+        code_files = [{"path": f"{i}.py", "content": "abcd" * 100} for i in range(3)]
+
+        assert CompressionService.estimate_tokens(code_files, limit=50) == 100
+
+
+class TestPassthrough:
+    """Test skipping the compression call for small inputs"""
+
+    @pytest.fixture
+    def service(self):
+        return CompressionService()
+
+    def test_threshold(self, service):
+        """Test code under the passthrough share of the target isn't compressed"""
+        # 1000 token target -> 800 token threshold -> 3200 ASCII characters
+        assert service.should_compress([{"path": "a.py", "content": "a" * 3200}], 1000) is True
+        assert service.should_compress([{"path": "a.py", "content": "a" * 3196}], 1000) is False
+
+    def test_uncompressed_result(self, service):
+        """Test passthrough results keep the code and report no compression"""
+        code_files = [{"path": "a.py", "content": "abcd" * 100}]
+
+        result = service.uncompressed_result(code_files)
+
+        assert result["compressed_code"] == service._combine_code_files(code_files)
+        assert result["original_tokens"] == result["compressed_tokens"] == 100
+        assert result["compression_ratio"] == 0.0
+        assert result["file_mapping"]["files"] == ["a.py"]
@@ -0,0 +1,64 @@
+"""Unit tests for token encryption"""
+
+import base64
+
+import pytest
+from cryptography.exceptions import InvalidTag
+
+from app.core.config import settings
+from app.utils.encryption import (
+    TOKEN_V2_PREFIX,
+    decrypt_token,
+    encrypt_token,
+    encrypt_token_v2,
+    reset_encryption_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def secret_key(monkeypatch):
+    monkeypatch.setattr(settings, "SECRET_KEY", "test-secret-key")
+    reset_encryption_cache()
+    yield
+    reset_encryption_cache()
+
+
+class TestTokenEncryption:
+    """Test AES-GCM tokens and the legacy Fernet fallback"""
+
+    def test_v2_round_trip(self):
+        """Test v2 tokens are prefixed and decrypt to the original"""
+        encrypted = encrypt_token_v2("gho_secret")
+
+        assert encrypted.startswith(TOKEN_V2_PREFIX)
+        assert decrypt_token(encrypted) == "gho_secret"
+
+    def test_v2_uses_fresh_nonce(self):
+        """Test encrypting the same token twice gives different ciphertexts"""
+        assert encrypt_token_v2("gho_secret") != encrypt_token_v2("gho_secret")
+
+    def test_legacy_fernet_fallback(self):
+        """Test tokens stored before v2 still decrypt"""
+        encrypted = encrypt_token("gho_secret")
+
+        assert not encrypted.startswith(TOKEN_V2_PREFIX)
+        assert decrypt_token(encrypted) == "gho_secret"
+
+    def test_v2_rejects_tampering(self):
+        """Test a modified v2 token fails authentication"""
+        payload = bytearray(base64.urlsafe_b64decode(encrypt_token_v2("gho_secret")[len(TOKEN_V2_PREFIX):]))
+        payload[-1] ^= 0x01
+        tampered = TOKEN_V2_PREFIX + base64.urlsafe_b64encode(bytes(payload)).decode()
+
+        with pytest.raises(InvalidTag):
+            decrypt_token(tampered)
+
+    def test_reset_after_key_rotation(self, monkeypatch):
+        """Test a rotated SECRET_KEY takes effect once the cache is reset"""
+        encrypted = encrypt_token_v2("gho_secret")
+
+        monkeypatch.setattr(settings, "SECRET_KEY", "rotated-secret-key")
+        reset_encryption_cache()
+
+        with pytest.raises(InvalidTag):
+            decrypt_token(encrypted)
@@ -0,0 +1,72 @@
+"""Unit tests for knowledge graph edge materialization"""
+
+import pytest
+
+from app.services.knowledge_graph_service import KnowledgeGraphService
+
+
+class TestBuildEdgePairs:
+    """Test CALLS/IMPORTS/EXTENDS pair construction"""
+
+    @pytest.fixture
+    def code_structure(self):
+        return {
+            "functions": [
+                {"name": "helper", "file_path": "b.py", "line_start": 1},
+                {"name": "main", "file_path": "a.py", "line_start": 20},
+                {"name": "setup", "file_path": "a.py", "line_start": 5},
+            ],
+            "calls": [
+                {"name": "print", "file_path": "a.py", "line": 2},
+                {"name": "connect", "file_path": "a.py", "line": 8},
+                {"name": "helper", "file_path": "a.py", "line": 20},
+                {"name": "run", "file_path": "a.py", "line": 25},
+                {"name": "open", "file_path": "b.py", "line": 3},
+                {"name": "orphan", "file_path": "c.py", "line": 1},
+            ],
+            "imports": [
+                {"module": "os", "file_path": "a.py", "line": 1},
+                {"module": None, "file_path": "a.py", "line": 2},
+            ],
+            "classes": [
+                {"name": "Child", "file_path": "b.py", "line_start": 10, "bases": ["Base", "Mixin"]},
+                {"name": "Plain", "file_path": "b.py", "line_start": 30, "bases": []},
+            ],
+        }
+
+    def test_calls_attributed_to_preceding_function(self, code_structure):
+        """Test each call is attributed to the closest function starting at or before it"""
+        calls = KnowledgeGraphService.build_edge_pairs(code_structure)["CALLS"]
+
+        assert [(call["source_file"], call["source_name"], call["target_name"]) for call in calls] == [
+            ("a.py", "setup", "connect"),
+            ("a.py", "main", "helper"),
+            ("a.py", "main", "run"),
+            ("b.py", "helper", "open"),
+        ]
+
+    def test_calls_outside_functions_skipped(self, code_structure):
+        """Test module-level calls and calls in files without functions are dropped"""
+        targets = {call["target_name"] for call in KnowledgeGraphService.build_edge_pairs(code_structure)["CALLS"]}
+
+        assert "print" not in targets
+        assert "orphan" not in targets
+
+    def test_imports(self, code_structure):
+        """Test imports without a module are skipped"""
+        imports = KnowledgeGraphService.build_edge_pairs(code_structure)["IMPORTS"]
+
+        assert imports == [{"source_file": "a.py", "target_name": "os", "line": 1}]
+
+    def test_extends_one_pair_per_base(self, code_structure):
+        """Test a class gets an EXTENDS pair for each base"""
+        extends = KnowledgeGraphService.build_edge_pairs(code_structure)["EXTENDS"]
+
+        assert extends == [
+            {"source_file": "b.py", "source_name": "Child", "target_name": "Base", "line": 10},
+            {"source_file": "b.py", "source_name": "Child", "target_name": "Mixin", "line": 10},
+        ]
+
+    def test_empty_structure(self):
+        """Test an empty code structure yields no pairs"""
+        assert KnowledgeGraphService.build_edge_pairs({}) == {"EXTENDS": [], "IMPORTS": [], "CALLS": []}
@@ -0,0 +1,159 @@
+"""Unit tests for per-commit task locks and analysis deduplication"""
+
+import pytest
+
+from app.core.database import RedisDB
+from app.models.analysis import AnalysisStatus
+from app.services.task_lock_service import TaskLockService
+from app.tasks import analysis_tasks
+from app.tasks.analysis_tasks import _claim_analysis, _dedup_ref
+
+
+class FakeRedis:
+    """In-memory stand-in for the few Redis commands TaskLockService uses"""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        self.ttls[key] = ex
+        return True
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+        self.ttls[key] = ttl
+        return True
+
+    async def eval(self, script, numkeys, key, owner):
+        # Only the compare-and-delete release script is exercised here
+        if self.data.get(key) == owner:
+            del self.data[key]
+            return 1
+        return 0
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(RedisDB, "get_client", lambda: fake)
+    return fake
+
+
+class TestTaskLockService:
+    """Test Redis-backed task locks"""
+
+    @pytest.mark.asyncio
+    async def test_acquire_is_exclusive(self, redis):
+        """Test only the first acquire of a lock succeeds"""
+        key = TaskLockService.lock_key("analyze", "octo/repo", "abc123")
+
+        assert await TaskLockService.acquire(key, "first", 60) is True
+        assert await TaskLockService.acquire(key, "second", 60) is False
+        assert await TaskLockService.get_owner(key) == "first"
+        assert redis.ttls[key] == 60
+
+    @pytest.mark.asyncio
+    async def test_release_only_by_owner(self, redis):
+        """Test a lock is kept when released by someone else"""
+        key = TaskLockService.lock_key("analyze", "octo/repo", "abc123")
+        await TaskLockService.acquire(key, "first", 60)
+
+        await TaskLockService.release(key, "second")
+        assert await TaskLockService.get_owner(key) == "first"
+
+        await TaskLockService.release(key, "first")
+        assert await TaskLockService.get_owner(key) is None
+
+    @pytest.mark.asyncio
+    async def test_mark_done(self, redis):
+        """Test completion markers are stored with the done TTL"""
+        assert await TaskLockService.get_done("analysis", "octo/repo", "abc123") is None
+
+        await TaskLockService.mark_done("analysis", "octo/repo", "abc123", "analysis-1")
+
+        assert await TaskLockService.get_done("analysis", "octo/repo", "abc123") == "analysis-1"
+        done_key = TaskLockService.done_key("analysis", "octo/repo", "abc123")
+        assert redis.ttls[done_key] == TaskLockService.DONE_TTL
+
+
+class TestClaimAnalysis:
+    """Test duplicate analysis detection"""
+
+    @pytest.fixture
+    def lock_key(self):
+        return TaskLockService.lock_key("analyze", "octo/repo", "abc123")
+
+    @pytest.mark.asyncio
+    async def test_first_claim_runs(self, redis, lock_key):
+        """Test the first analysis for a commit takes the lock"""
+        assert await _claim_analysis("analysis-1", "octo/repo", "abc123", lock_key) is None
+        assert redis.data[lock_key] == "analysis-1"
+
+    @pytest.mark.asyncio
+    async def test_redelivery_to_same_owner_runs(self, redis, lock_key):
+        """Test a redelivered task still holding its own lock is not a duplicate"""
+        await _claim_analysis("analysis-1", "octo/repo", "abc123", lock_key)
+
+        assert await _claim_analysis("analysis-1", "octo/repo", "abc123", lock_key) is None
+
+    @pytest.mark.asyncio
+    async def test_in_flight_duplicate(self, redis, lock_key):
+        """Test a second analysis of an in-flight commit points at the first"""
+        await _claim_analysis("analysis-1", "octo/repo", "abc123", lock_key)
+
+        assert await _claim_analysis("analysis-2", "octo/repo", "abc123", lock_key) == "analysis-1"
+
+    @pytest.mark.asyncio
+    async def test_completed_duplicate(self, redis, lock_key):
+        """Test an analysis of an already analyzed commit short-circuits"""
+        await TaskLockService.mark_done("analysis", "octo/repo", "abc123", "analysis-1")
+
+        assert await _claim_analysis("analysis-2", "octo/repo", "abc123", lock_key) == "analysis-1"
+        assert lock_key not in redis.data
+
+    @pytest.mark.asyncio
+    async def test_completed_redelivery_runs(self, redis, lock_key):
+        """Test the analysis recorded as done isn't reported as its own duplicate"""
+        await TaskLockService.mark_done("analysis", "octo/repo", "abc123", "analysis-1")
+
+        assert await _claim_analysis("analysis-1", "octo/repo", "abc123", lock_key) is None
+
+    @pytest.mark.asyncio
+    async def test_pr_analysis_not_deduplicated_against_push(self, redis):
+        """Test a PR analysis still runs for a commit a push analysis already covered"""
+        await TaskLockService.mark_done("analysis", "octo/repo", _dedup_ref("abc123", None), "analysis-1")
+
+        pr_ref = _dedup_ref("abc123", 7)
+        pr_lock_key = TaskLockService.lock_key("analyze", "octo/repo", pr_ref)
+        assert await _claim_analysis("analysis-2", "octo/repo", pr_ref, pr_lock_key) is None
+
+    @pytest.mark.asyncio
+    async def test_duplicate_short_circuits_analysis(self, redis, monkeypatch):
+        """Test a duplicate analysis is completed without cloning or running agents"""
+        updates = []
+
+        async def fake_update_status(analysis_id, status, fields=None, **kwargs):
+            updates.append((analysis_id, status, fields))
+
+        monkeypatch.setattr(analysis_tasks, "get_worker_service", lambda cls: None)
+        monkeypatch.setattr(analysis_tasks, "AgentOrchestrator", lambda **kwargs: None)
+        monkeypatch.setattr(analysis_tasks, "_update_analysis_status", fake_update_status)
+        await TaskLockService.mark_done("analysis", "octo/repo", "abc123", "analysis-1")
+
+        result = await analysis_tasks._run_analysis_async(
+            "analysis-2", "octo/repo", "abc123", "https://github.com/octo/repo.git", None
+        )
+
+        assert result == {"analysis_id": "analysis-1", "status": "duplicate"}
+        assert len(updates) == 1
+        analysis_id, status, fields = updates[0]
+        assert analysis_id == "analysis-2"
+        assert status == AnalysisStatus.COMPLETED
+        assert fields["duplicate_of"] == "analysis-1"
@@ -0,0 +1,77 @@
+"""Unit tests for GitHub App installation syncing"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.database import MongoDB
+from app.services import user_auth_service
+from app.services.user_auth_service import UserAuthService
+
+
+class FakeUsersCollection:
+    """Records the reads and bulk writes _persist_installations makes"""
+
+    def __init__(self, installation_ids):
+        self.document = {"installations": [{"installation_id": i} for i in installation_ids]}
+        self.bulk_writes = []
+
+    async def find_one(self, query, projection=None):
+        return self.document
+
+    async def bulk_write(self, operations, ordered=True):
+        self.bulk_writes.append((operations, ordered))
+
+
+def _installation(installation_id):
+    return {"id": installation_id, "account": {"login": f"org-{installation_id}", "type": "Organization"}}
+
+
+class TestPersistInstallations:
+    """Test the add/remove diff written for a user's installations"""
+
+    @pytest.fixture
+    def users(self, monkeypatch):
+        collection = FakeUsersCollection([1, 2])
+        monkeypatch.setattr(MongoDB, "get_database", lambda: SimpleNamespace(users=collection))
+        # Record operations as plain (filter, update) pairs
+        monkeypatch.setattr(user_auth_service, "UpdateOne", lambda query, update: (query, update))
+        return collection
+
+    @pytest.mark.asyncio
+    async def test_adds_and_removes(self, users):
+        """Test only new installations are added and missing ones pulled"""
+        await UserAuthService._persist_installations(42, [_installation(2), _installation(3)])
+
+        assert len(users.bulk_writes) == 1
+        (pull, add), ordered = users.bulk_writes[0]
+        assert ordered is True
+
+        assert pull == (
+            {"github_id": 42},
+            {"$pull": {"installations": {"installation_id": {"$in": [1]}}}}
+        )
+
+        query, update = add
+        assert query == {"github_id": 42}
+        added = update["$addToSet"]["installations"]["$each"]
+        assert [inst["installation_id"] for inst in added] == [3]
+        assert added[0]["account_login"] == "org-3"
+        assert added[0]["account_type"] == "Organization"
+        assert "updated_at" in update["$set"]
+
+    @pytest.mark.asyncio
+    async def test_only_removes(self, users):
+        """Test a pure removal still bumps updated_at without an $addToSet"""
+        await UserAuthService._persist_installations(42, [_installation(1)])
+
+        (pull, touch), _ = users.bulk_writes[0]
+        assert pull[1]["$pull"]["installations"]["installation_id"]["$in"] == [2]
+        assert "$addToSet" not in touch[1]
+
+    @pytest.mark.asyncio
+    async def test_unchanged_skips_write(self, users):
+        """Test nothing is written when installations are up to date"""
+        await UserAuthService._persist_installations(42, [_installation(1), _installation(2)])
+
+        assert users.bulk_writes == []